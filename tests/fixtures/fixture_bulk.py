@@ -0,0 +1,76 @@
+import random
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from faker import Faker
+
+from posts.counters import rebuild_counters
+from posts.feed import add_author_to_feed
+from posts.models import Comment, Follow, Group, Post
+
+BULK_USERS = 200
+BULK_GROUPS = 20
+BULK_POSTS = 3000
+BULK_COMMENTS = 5000
+BULK_FOLLOWS_PER_USER = 10
+
+
+@pytest.fixture(scope='module')
+def bulk_data(django_db_setup, django_db_blocker):
+    """Большой набор данных для замеров запросов и времени ответа.
+
+    Создаётся один раз на модуль через bulk_create, сигналы не
+    срабатывают, поэтому ленты и счётчики заполняются явно.
+    """
+    fake = Faker('ru_RU')
+    fake.seed_instance(2023)
+    rnd = random.Random(2023)
+    User = get_user_model()
+    with django_db_blocker.unblock():
+        User.objects.bulk_create(
+            User(username=f'bulk_user_{index}') for index in range(BULK_USERS)
+        )
+        users = list(User.objects.filter(username__startswith='bulk_user_'))
+        Group.objects.bulk_create(
+            Group(title=fake.word(), slug=f'bulk-group-{index}', description=fake.sentence())
+            for index in range(BULK_GROUPS)
+        )
+        groups = list(Group.objects.filter(slug__startswith='bulk-group-'))
+        Post.objects.bulk_create(
+            (
+                Post(text=fake.text(200), author=rnd.choice(users), group=rnd.choice(groups + [None]))
+                for _ in range(BULK_POSTS)
+            ),
+            batch_size=500,
+        )
+        posts = list(Post.objects.values_list('id', flat=True))
+        Comment.objects.bulk_create(
+            (
+                Comment(text=fake.sentence(), author=rnd.choice(users), post_id=rnd.choice(posts))
+                for _ in range(BULK_COMMENTS)
+            ),
+            batch_size=500,
+        )
+        follows = {
+            (user.id, author.id)
+            for user in users
+            for author in rnd.sample(users, BULK_FOLLOWS_PER_USER)
+            if author.id != user.id
+        }
+        Follow.objects.bulk_create(
+            Follow(user_id=user_id, author_id=author_id) for user_id, author_id in follows
+        )
+        for user_id, author_id in follows:
+            add_author_to_feed(user_id, author_id)
+        rebuild_counters()
+        busiest_post = Comment.objects.values('post_id').annotate(
+            total=Count('id')
+        ).order_by('-total').first()['post_id']
+        yield {
+            'user': users[0],
+            'group': groups[0],
+            'post': Post.objects.get(pk=busiest_post),
+        }
+        User.objects.filter(username__startswith='bulk_user_').delete()
+        Group.objects.filter(slug__startswith='bulk-group-').delete()
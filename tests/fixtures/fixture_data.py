@@ -1,6 +1,7 @@
 import tempfile
 
 import pytest
+from core.workers import wait_pending
 from mixer.backend.django import mixer as _mixer
 from posts.models import Post, Group
 
@@ -10,6 +11,8 @@ def mock_media(settings):
     with tempfile.TemporaryDirectory() as temp_directory:
         settings.MEDIA_ROOT = temp_directory
         yield temp_directory
+        # миниатюры создаются в фоне и могут писать во временную папку
+        wait_pending()
 
 
 @pytest.fixture
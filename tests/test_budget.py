@@ -0,0 +1,114 @@
+import json
+import os
+import statistics
+import time
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.constants import CURSOR_ORDERING, POSTS_NUMBER
+from posts.models import Post
+from posts.utils import CursorPaginator
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'budgets.json')
+# RECORD_BUDGETS=1 py.test tests/test_budget.py перезаписывает бюджеты
+RECORD_BUDGETS = bool(os.environ.get('RECORD_BUDGETS'))
+# Запас по времени при записи бюджета: замеры на CI шумные
+TIME_HEADROOM = 3
+MIN_BUDGET_MS = 100
+ROUNDS = 5
+# Страница keyset-пагинации далеко от начала ленты
+DEEP_PAGE = 100
+
+
+def deep_cursor(data):
+    post = Post.objects.order_by(*CURSOR_ORDERING)[DEEP_PAGE * POSTS_NUMBER - 1]
+    cursor = CursorPaginator(None, POSTS_NUMBER).encode_cursor(post, 'next')
+    return f'/?cursor={cursor}'
+
+
+VIEW_URLS = {
+    'index': lambda data: '/',
+    'index_deep_cursor': deep_cursor,
+    'group_posts': lambda data: f'/group/{data["group"].slug}/',
+    'profile': lambda data: f'/profile/{data["user"].username}/',
+    'post_detail': lambda data: f'/posts/{data["post"].id}/',
+    'follow_index': lambda data: '/follow/',
+}
+LOGIN_REQUIRED = {'follow_index'}
+KEYSET_VIEWS = {'index_deep_cursor'}
+
+
+def load_budgets():
+    if not os.path.exists(BUDGETS_PATH):
+        return {}
+    with open(BUDGETS_PATH, encoding='utf-8') as budgets_file:
+        return json.load(budgets_file)
+
+
+def save_budget(view_name, queries, milliseconds):
+    budgets = load_budgets()
+    budgets[view_name] = {
+        'queries': queries,
+        'ms': max(round(milliseconds * TIME_HEADROOM, 1), MIN_BUDGET_MS),
+    }
+    with open(BUDGETS_PATH, 'w', encoding='utf-8') as budgets_file:
+        json.dump(budgets, budgets_file, indent=4, sort_keys=True)
+        budgets_file.write('\n')
+
+
+def measure(client, url):
+    """Максимум запросов и медиана времени ответа без кеша страниц."""
+    client.get(url)
+    queries, timings = [], []
+    for _ in range(ROUNDS):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, f'Страница `{url}` вернула {response.status_code}'
+        queries.append(len(context.captured_queries))
+    return max(queries), statistics.median(timings)
+
+
+def check_keyset_page(client, url):
+    """Глубокая страница выбирается условием по курсору, а не OFFSET."""
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    expected = Post.objects.order_by(*CURSOR_ORDERING)[DEEP_PAGE * POSTS_NUMBER]
+    assert response.context['page_obj'][0] == expected, (
+        f'Страница `{url}` должна начинаться с поста {DEEP_PAGE * POSTS_NUMBER + 1}'
+    )
+    assert not any('OFFSET' in query['sql'] for query in context.captured_queries), (
+        f'Страница `{url}` выбирается через OFFSET'
+    )
+
+
+@pytest.mark.django_db
+class TestViewBudgets:
+
+    @pytest.mark.parametrize('view_name', sorted(VIEW_URLS))
+    def test_view_budget(self, client, bulk_data, view_name):
+        if view_name in LOGIN_REQUIRED:
+            client.force_login(bulk_data['user'])
+        url = VIEW_URLS[view_name](bulk_data)
+        queries, milliseconds = measure(client, url)
+        if view_name in KEYSET_VIEWS:
+            check_keyset_page(client, url)
+        if RECORD_BUDGETS:
+            save_budget(view_name, queries, milliseconds)
+            return
+        budget = load_budgets().get(view_name)
+        assert budget is not None, (
+            f'Для `{view_name}` нет бюджета в {BUDGETS_PATH}, запустите тесты с RECORD_BUDGETS=1'
+        )
+        assert queries <= budget['queries'], (
+            f'`{view_name}` выполняет {queries} SQL-запросов, бюджет {budget["queries"]}'
+        )
+        assert milliseconds <= budget['ms'], (
+            f'`{view_name}` отвечает за {milliseconds:.1f} мс, бюджет {budget["ms"]} мс'
+        )
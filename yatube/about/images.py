@@ -0,0 +1,57 @@
+"""Обработка аватаров профиля вне запроса.
+
+Оригинал уменьшается до PROFILE_IMAGE_SIZE, а рядом сохраняются
+копии в современных форматах (WebP, AVIF), если их поддерживает
+установленный Pillow.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from PIL import Image, features
+
+PROFILE_IMAGE_SIZE = (300, 300)
+MODERN_FORMATS = (
+    ('WEBP', '.webp', 'webp'),
+    ('AVIF', '.avif', 'avif'),
+)
+
+
+def file_hash(file):
+    """sha256 содержимого файла, читаемого по частям."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def supported_formats():
+    """Современные форматы, которые умеет сохранять Pillow."""
+    formats = []
+    for image_format, extension, feature in MODERN_FORMATS:
+        supported = (
+            features.check(feature) if feature in features.modules
+            else image_format in Image.SAVE
+        )
+        if supported:
+            formats.append((image_format, extension))
+    return formats
+
+
+def modern_name(name, extension):
+    return os.path.splitext(name)[0] + extension
+
+
+def process_profile_image(name):
+    """Уменьшает картинку и пишет её копии в современных форматах."""
+    path = default_storage.path(name)
+    with Image.open(path) as img:
+        img.load()
+        if img.height > PROFILE_IMAGE_SIZE[1] or (
+            img.width > PROFILE_IMAGE_SIZE[0]
+        ):
+            img.thumbnail(PROFILE_IMAGE_SIZE)
+            img.save(path)
+        for image_format, extension in supported_formats():
+            img.save(modern_name(path, extension), image_format)
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from about.images import process_profile_image, supported_formats
+from about.models import Profile
+
+
+class Command(BaseCommand):
+    help = ('Уменьшает аватары профилей и пересохраняет их '
+            'в современных форматах в несколько потоков')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Количество потоков'
+        )
+
+    def handle(self, *args, **options):
+        formats = ', '.join(name for name, _ in supported_formats())
+        self.stdout.write(f'Форматы: {formats or "нет поддержки"}')
+        names = Profile.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct().iterator()
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [pool.submit(process_profile_image, name)
+                       for name in names]
+            for future in futures:
+                if future.exception() is None:
+                    done += 1
+                else:
+                    failed += 1
+                    self.stderr.write(str(future.exception()))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано: {done}, с ошибками: {failed}'
+        ))
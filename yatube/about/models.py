@@ -1,21 +1,37 @@
-from django.db import models
 from django.contrib.auth.models import User
-from PIL import Image
+from django.db import models
+
+from core import workers
+
+from .images import file_hash, process_profile_image
 
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     image = models.ImageField(default='default.jpg', upload_to='profile_pics')
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
 
     def __str__(self):
         return f'{self.user.username} Profile'
 
     def save(self, *args, **kwargs):
+        # Картинка обрабатывается только если загружен новый файл
+        # с другим содержимым, и не в запросе, а в фоновом пуле.
+        changed = False
+        if self.image and not self.image._committed:
+            digest = file_hash(self.image)
+            stored = self.pk and Profile.objects.filter(
+                pk=self.pk
+            ).values_list('image', flat=True).first()
+            if digest == self.image_hash and stored:
+                self.image = stored
+            else:
+                changed = True
+                self.image_hash = digest
         super(Profile, self).save(*args, **kwargs)
-
-        img = Image.open(self.image.path)
-
-        if img.height > 300 or img.width > 300:
-            output_size = (300, 300)
-            img.thumbnail(output_size)
-            img.save(self.image.path)
\ No newline at end of file
+        if changed:
+            workers.submit_on_commit(
+                ('profile_image', self.image.name),
+                process_profile_image,
+                self.image.name,
+            )
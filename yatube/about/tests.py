@@ -0,0 +1,53 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .images import PROFILE_IMAGE_SIZE, process_profile_image
+from .models import Profile
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name='avatar.png', size=(600, 400), color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ProfileImageTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='User')
+
+    def test_save_does_not_resize_in_request(self):
+        """Сохранение профиля не трогает картинку, это делает пул."""
+        profile = Profile.objects.create(user=self.user, image=make_image())
+        self.assertEqual(len(profile.image_hash), 64)
+        with Image.open(profile.image.path) as img:
+            self.assertEqual(img.size, (600, 400))
+        process_profile_image(profile.image.name)
+        with Image.open(profile.image.path) as img:
+            self.assertLessEqual(img.width, PROFILE_IMAGE_SIZE[0])
+            self.assertLessEqual(img.height, PROFILE_IMAGE_SIZE[1])
+
+    def test_same_image_is_not_stored_again(self):
+        """Повторная загрузка того же содержимого не создаёт файл."""
+        profile = Profile.objects.create(user=self.user, image=make_image())
+        name = profile.image.name
+        profile.image = make_image('other.png')
+        profile.save()
+        self.assertEqual(profile.image.name, name)
+        profile.image = make_image('other.png', color='blue')
+        profile.save()
+        self.assertNotEqual(profile.image.name, name)
@@ -0,0 +1,6 @@
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+LIMIT_PARAM = 'limit'
+FIELDS_PARAM = 'fields'
+GROUPS_ORDERING = ('id',)
+FOLLOWS_ORDERING = ('-id',)
@@ -0,0 +1,91 @@
+"""Сериализация строк .values() в словари ответа API.
+
+Сериализатор знает, из какого поля запроса берётся каждое поле
+ответа, и выбирает из базы только поля, запрошенные параметром
+?fields=, и поля, нужные курсору пагинации. Модели не создаются.
+"""
+from posts.models import Post
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def isoformat(value):
+    return value.isoformat()
+
+
+def image_url(name):
+    return Post.image.field.storage.url(name) if name else None
+
+
+class ValuesSerializer:
+    fields = {}
+    converters = {}
+    required = ('id',)
+
+    def __init__(self, requested=None):
+        names = [
+            name.strip() for name in (requested or '').split(',')
+            if name.strip()
+        ]
+        unknown = set(names) - set(self.fields)
+        if unknown:
+            raise FieldsError(
+                'Неизвестные поля: {}'.format(', '.join(sorted(unknown)))
+            )
+        self.names = names or list(self.fields)
+
+    def values(self, queryset):
+        lookups = [self.fields[name] for name in self.names]
+        return queryset.values(*dict.fromkeys(lookups + list(self.required)))
+
+    def to_dict(self, row):
+        return {
+            name: self.converters.get(name, lambda value: value)(
+                row[self.fields[name]]
+            )
+            for name in self.names
+        }
+
+
+class PostSerializer(ValuesSerializer):
+    fields = {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group_id',
+        'image': 'image',
+        'comments_count': 'comments_count',
+    }
+    converters = {'pub_date': isoformat, 'image': image_url}
+    required = ('pub_date', 'id')
+
+
+class CommentSerializer(ValuesSerializer):
+    fields = {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }
+    converters = {'created': isoformat}
+    required = ('created', 'id')
+
+
+class GroupSerializer(ValuesSerializer):
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+    }
+
+
+class FollowSerializer(ValuesSerializer):
+    fields = {
+        'user': 'user__username',
+        'author': 'author__username',
+    }
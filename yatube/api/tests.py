@@ -0,0 +1,223 @@
+import json
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {index}', author=cls.author, group=cls.group
+            )
+            for index in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def post_json(self, client, url, data, method='post'):
+        return getattr(client, method)(
+            url, json.dumps(data), content_type='application/json'
+        )
+
+    def test_posts_sparse_fields_and_cursor(self):
+        """Список постов листается курсором и отдаёт только нужные поля."""
+        url = reverse('api:post_list')
+        response = self.client.get(url, {'fields': 'id,text', 'limit': 3})
+        data = response.json()
+        self.assertEqual(
+            [set(post) for post in data['results']], [{'id', 'text'}] * 3
+        )
+        rest = self.client.get(
+            url, {'fields': 'id', 'limit': 3, 'cursor': data['next']}
+        ).json()
+        ids = [post['id'] for post in data['results'] + rest['results']]
+        self.assertEqual(ids, [post.id for post in reversed(self.posts)])
+        self.assertIsNone(rest['next'])
+        self.assertEqual(
+            self.client.get(url, {'fields': 'password'}).status_code, 400
+        )
+
+    def test_conditional_get(self):
+        """Неизменённый список отдаётся ответом 304 без запросов к базе."""
+        url = reverse('api:post_list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Комментарий'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etags_change_on_username_change(self):
+        """Имя автора в ответах API не устаревает после переименования."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(
+            post=self.posts[0], author=self.author, text='Комментарий'
+        )
+        urls = (
+            reverse('api:post_list'),
+            reverse('api:post_detail', args=[self.posts[0].id]),
+            reverse('api:comment_list', args=[self.posts[0].id]),
+            reverse('api:feed'),
+            reverse('api:follow_list'),
+        )
+        etags = [self.reader_client.get(url)['ETag'] for url in urls]
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'renamed'
+        author.save()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('renamed', response.content.decode())
+
+    def test_create_and_edit_post(self):
+        url = reverse('api:post_list')
+        self.assertEqual(
+            self.post_json(self.client, url, {'text': 'Новый'}).status_code,
+            401,
+        )
+        response = self.post_json(
+            self.author_client, url, {'text': 'Новый', 'group': self.group.id}
+        )
+        self.assertEqual(response.status_code, 201)
+        created = response.json()
+        self.assertEqual(created['author'], 'author')
+        detail = reverse('api:post_detail', args=[created['id']])
+        response = self.post_json(
+            self.reader_client, detail, {'text': 'Чужой'}, 'patch'
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.post_json(
+            self.author_client, detail, {'text': 'Исправлен'}, 'patch'
+        )
+        self.assertEqual(response.json()['text'], 'Исправлен')
+        self.assertEqual(response.json()['group'], self.group.id)
+        self.assertEqual(
+            self.author_client.delete(detail).status_code, 204
+        )
+        self.assertEqual(self.client.get(detail).status_code, 404)
+
+    def test_writes_run_in_transaction(self):
+        """Сигналы записи выполняются в транзакции запроса."""
+        depth = len(connection.savepoint_ids)
+        depths = []
+        with patch(
+            'posts.signals.counters.change_user_counter',
+            side_effect=lambda *args: depths.append(
+                len(connection.savepoint_ids)
+            ),
+        ):
+            self.post_json(
+                self.author_client, reverse('api:post_list'), {'text': 'Т'}
+            )
+            self.post_json(
+                self.reader_client, reverse('api:follow_list'),
+                {'author': 'author'},
+            )
+            self.reader_client.delete(
+                reverse('api:follow_detail', args=['author'])
+            )
+        self.assertEqual(len(depths), 5)
+        self.assertTrue(all(current > depth for current in depths))
+
+    def test_csrf_failure_is_json(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.author)
+        response = self.post_json(
+            client, reverse('api:post_list'), {'text': 'Без токена'}
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('CSRF', response.json()['detail'])
+        response = client.post(reverse('posts:post_create'), {'text': 'Т'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+
+    def test_patch_with_form_data(self):
+        """PATCH формой меняет пост так же, как JSON."""
+        detail = reverse('api:post_detail', args=[self.posts[0].id])
+        response = self.author_client.patch(
+            detail, urlencode({'text': 'Из формы'}),
+            content_type='application/x-www-form-urlencoded',
+        )
+        self.assertEqual(response.json()['text'], 'Из формы')
+        response = self.author_client.patch(
+            detail, encode_multipart(BOUNDARY, {'text': 'Из multipart'}),
+            content_type=MULTIPART_CONTENT,
+        )
+        self.assertEqual(response.json()['text'], 'Из multipart')
+        response = self.author_client.patch(
+            detail, 'text', content_type='text/plain'
+        )
+        self.assertEqual(response.status_code, 415)
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].text, 'Из multipart')
+
+    def test_comments(self):
+        url = reverse('api:comment_list', args=[self.posts[0].id])
+        response = self.post_json(
+            self.reader_client, url, {'text': 'Комментарий'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            self.client.get(url).json()['results'][0]['author'], 'reader'
+        )
+        self.assertEqual(
+            self.post_json(self.reader_client, url, {}).status_code, 400
+        )
+
+    def test_follow_and_feed(self):
+        """Подписка идемпотентна, лента содержит посты автора."""
+        url = reverse('api:follow_list')
+        statuses = [
+            self.post_json(
+                self.reader_client, url, {'author': 'author'}
+            ).status_code
+            for _ in range(2)
+        ]
+        self.assertEqual(statuses, [201, 200])
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 1)
+        feed = self.reader_client.get(reverse('api:feed')).json()
+        self.assertEqual(len(feed['results']), 5)
+        self.assertEqual(
+            self.reader_client.delete(
+                reverse('api:follow_detail', args=['author'])
+            ).status_code,
+            204,
+        )
+        self.assertEqual(
+            self.reader_client.get(url).json()['results'], []
+        )
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_groups(self):
+        response = self.client.get(reverse('api:group_detail', args=['group']))
+        self.assertEqual(response.json()['title'], 'Группа')
+        self.assertEqual(
+            len(self.client.get(reverse('api:group_list')).json()['results']),
+            1,
+        )
@@ -0,0 +1,314 @@
+"""JSON API для мобильного клиента.
+
+Авторизация — сессией сайта: клиент входит формой users:login,
+сохраняет cookie sessionid и csrftoken и в запросах, которые что-то
+меняют, передаёт значение csrftoken в заголовке X-CSRFToken. Без него
+ответ — 403 с JSON (core.views.csrf_failure). Записи выполняются
+в транзакции вместе с сигналами счётчиков, лент и поколений кеша.
+"""
+import json
+from functools import wraps
+
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, QueryDict
+from django.views.decorators.http import require_http_methods
+
+from core.cache import condition_by_generation
+from posts import follows
+from posts.constants import COMMENTS_ORDERING, CURSOR_ORDERING, CURSOR_PARAM
+from posts.feed import feed_posts
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import CursorPaginator
+
+from .constants import (FIELDS_PARAM, FOLLOWS_ORDERING, GROUPS_ORDERING,
+                        LIMIT_PARAM, MAX_PAGE_SIZE, PAGE_SIZE)
+from .serializers import (CommentSerializer, FieldsError, FollowSerializer,
+                          GroupSerializer, PostSerializer)
+
+
+def error(message, status, **extra):
+    return JsonResponse({'detail': message, **extra}, status=status)
+
+
+def api_login_required(view):
+    """Для анонимных запросов — 401 вместо перехода на страницу входа."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error('Требуется авторизация', 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def api_login_required_for_writes(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        return api_login_required(view)(request, *args, **kwargs)
+    return wrapper
+
+
+def with_serializer(serializer_class):
+    """Передаёт во view сериализатор с полями из ?fields=."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                serializer = serializer_class(request.GET.get(FIELDS_PARAM))
+            except FieldsError as exc:
+                return error(str(exc), 400)
+            return view(request, serializer, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class DataError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+FORM_CONTENT_TYPES = (
+    'multipart/form-data', 'application/x-www-form-urlencoded',
+)
+
+
+def request_data(request):
+    """Данные запроса (словарь) из JSON или из формы с файлами.
+
+    Django разбирает форму только в POST, тело PATCH разбирается здесь.
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            raise DataError('Тело запроса должно быть JSON-объектом')
+        return data, None
+    if request.content_type not in FORM_CONTENT_TYPES:
+        raise DataError(
+            f'Неподдерживаемый тип содержимого: {request.content_type}', 415
+        )
+    if request.method == 'POST':
+        data, files = request.POST, request.FILES
+    elif request.content_type == 'multipart/form-data':
+        data, files = request.parse_file_upload(request.META, request)
+    else:
+        data = QueryDict(request.body, encoding=request.encoding)
+        files = None
+    return data.dict(), files
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get(LIMIT_PARAM, PAGE_SIZE))
+    except ValueError:
+        limit = PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def paginated(request, queryset, serializer, ordering):
+    paginator = CursorPaginator(
+        serializer.values(queryset.order_by(*ordering)),
+        page_size(request),
+        ordering,
+    )
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    return page_response(page, [serializer.to_dict(row) for row in page])
+
+
+def paginated_entries(request, entries, serializer, ordering):
+    """Страница ленты по ключам FeedEntry, посты — запросом по id."""
+    paginator = CursorPaginator(
+        entries.values('pub_date', 'post_id'), page_size(request), ordering
+    )
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    ids = [row['post_id'] for row in page]
+    rows = {
+        row['id']: row
+        for row in serializer.values(Post.objects.filter(id__in=ids))
+    }
+    return page_response(
+        page, [serializer.to_dict(rows[pk]) for pk in ids if pk in rows]
+    )
+
+
+def page_response(page, results):
+    return JsonResponse({
+        'results': results,
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def serialized(queryset, serializer, status=200):
+    row = serializer.values(queryset).first()
+    if row is None:
+        return error('Не найдено', 404)
+    return JsonResponse(serializer.to_dict(row), status=status)
+
+
+def form_errors(form):
+    return error('Неверные данные', 400, errors=form.errors)
+
+
+@require_http_methods(['GET', 'HEAD', 'POST'])
+@api_login_required_for_writes
+@with_serializer(PostSerializer)
+@condition_by_generation('posts', 'comments', 'users')
+def post_list(request, serializer):
+    """Посты с фильтрами ?group=<slug> и ?author=<username>; создание."""
+    if request.method == 'POST':
+        try:
+            data, files = request_data(request)
+        except DataError as exc:
+            return error(str(exc), exc.status)
+        form = PostForm(data, files=files)
+        if not form.is_valid():
+            return form_errors(form)
+        with transaction.atomic():
+            post = form.save(commit=False)
+            post.author = request.user
+            post.save()
+        return serialized(Post.objects.filter(pk=post.pk), serializer, 201)
+    posts = Post.objects.all()
+    if 'group' in request.GET:
+        posts = posts.filter(group__slug=request.GET['group'])
+    if 'author' in request.GET:
+        posts = posts.filter(author__username=request.GET['author'])
+    return paginated(request, posts, serializer, CURSOR_ORDERING)
+
+
+@require_http_methods(['GET', 'HEAD', 'PATCH', 'DELETE'])
+@api_login_required_for_writes
+@with_serializer(PostSerializer)
+@condition_by_generation('posts', 'comments', 'users')
+def post_detail(request, serializer, post_id):
+    """Пост; изменять и удалять его может только автор."""
+    if request.method in ('GET', 'HEAD'):
+        return serialized(Post.objects.filter(pk=post_id), serializer)
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return error('Не найдено', 404)
+    if post.author_id != request.user.pk:
+        return error('Изменять пост может только автор', 403)
+    if request.method == 'DELETE':
+        with transaction.atomic():
+            post.delete()
+        return HttpResponse(status=204)
+    try:
+        data, files = request_data(request)
+    except DataError as exc:
+        return error(str(exc), exc.status)
+    form = PostForm(
+        {'text': post.text, 'group': post.group_id, **data},
+        files=files,
+        instance=post,
+    )
+    if not form.is_valid():
+        return form_errors(form)
+    with transaction.atomic():
+        form.save()
+    return serialized(Post.objects.filter(pk=post.pk), serializer)
+
+
+@require_http_methods(['GET', 'HEAD', 'POST'])
+@api_login_required_for_writes
+@with_serializer(CommentSerializer)
+@condition_by_generation('comments:{post_id}', 'users')
+def comment_list(request, serializer, post_id):
+    """Комментарии поста, новые первыми; добавление комментария."""
+    post = Post.objects.only('id').filter(pk=post_id).first()
+    if post is None:
+        return error('Не найдено', 404)
+    if request.method == 'POST':
+        try:
+            data, _ = request_data(request)
+        except DataError as exc:
+            return error(str(exc), exc.status)
+        form = CommentForm(data)
+        if not form.is_valid():
+            return form_errors(form)
+        with transaction.atomic():
+            comment = form.save(commit=False)
+            comment.author = request.user
+            comment.post = post
+            comment.save()
+        return serialized(
+            Comment.objects.filter(pk=comment.pk), serializer, 201
+        )
+    return paginated(
+        request, post.comments.all(), serializer, COMMENTS_ORDERING
+    )
+
+
+@require_http_methods(['GET', 'HEAD'])
+@with_serializer(GroupSerializer)
+@condition_by_generation('posts')
+def group_list(request, serializer):
+    return paginated(
+        request, Group.objects.all(), serializer, GROUPS_ORDERING
+    )
+
+
+@require_http_methods(['GET', 'HEAD'])
+@with_serializer(GroupSerializer)
+@condition_by_generation('posts')
+def group_detail(request, serializer, slug):
+    return serialized(Group.objects.filter(slug=slug), serializer)
+
+
+@require_http_methods(['GET', 'HEAD'])
+@api_login_required
+@with_serializer(PostSerializer)
+@condition_by_generation('posts', 'comments', 'users', 'profile:{user}')
+def feed(request, serializer):
+    """Лента подписок текущего пользователя."""
+    posts, ordering = feed_posts(request.user)
+    if posts.model is Post:
+        return paginated(request, posts, serializer, ordering)
+    return paginated_entries(request, posts, serializer, ordering)
+
+
+@require_http_methods(['GET', 'HEAD', 'POST'])
+@api_login_required
+@with_serializer(FollowSerializer)
+@condition_by_generation('profile:{user}', 'users')
+def follow_list(request, serializer):
+    """Подписки текущего пользователя; подписка {"author": username}."""
+    if request.method == 'POST':
+        try:
+            data, _ = request_data(request)
+        except DataError as exc:
+            return error(str(exc), exc.status)
+        author = User.objects.filter(username=data.get('author')).first()
+        if author is None:
+            return error('Автор не найден', 404)
+        if author == request.user:
+            return error('Нельзя подписаться на себя', 400)
+        with transaction.atomic():
+            created = follows.follow(request.user, author)
+        return serialized(
+            Follow.objects.filter(user=request.user, author=author),
+            serializer,
+            201 if created else 200,
+        )
+    return paginated(
+        request, Follow.objects.filter(user=request.user), serializer,
+        FOLLOWS_ORDERING,
+    )
+
+
+@require_http_methods(['DELETE'])
+@api_login_required
+def follow_detail(request, username):
+    """Отписка; повторная отписка тоже успешна."""
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error('Автор не найден', 404)
+    with transaction.atomic():
+        follows.unfollow(request.user, author)
+    return HttpResponse(status=204)
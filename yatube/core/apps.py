@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .assets import check_vendor_assets
+        from .db import configure_sqlite
+        connection_created.connect(configure_sqlite)
+        checks.register(check_vendor_assets)
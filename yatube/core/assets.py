@@ -0,0 +1,105 @@
+"""Локальные копии сторонних CSS, JS и шрифтов.
+
+manage.py fetch_assets скачивает VENDOR_ASSETS в static/vendor,
+а файлы, на которые ссылаются скачанные CSS (шрифты), — рядом,
+в static/vendor/fonts, с заменой адресов в CSS на относительные.
+Дальше они проходят collectstatic вместе с остальной статикой.
+Тег {% vendor_asset %} выбирает локальную копию при
+LOCAL_VENDOR_ASSETS и адрес CDN иначе; без скачанных файлов
+проверка check_vendor_assets не даёт запустить collectstatic и сервер.
+"""
+import os
+import posixpath
+import re
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from django.conf import settings
+from django.core import checks
+
+VENDOR_DIR = 'vendor'
+VENDOR_ASSETS = {
+    'bootstrap.min.css': 'https://maxcdn.bootstrapcdn.com/bootstrap/4.0.0/'
+                         'css/bootstrap.min.css',
+    'roboto.css': 'https://fonts.googleapis.com/css?family=Roboto:400,100,'
+                  '100italic,300,300italic,400italic,500,500italic,700,'
+                  '700italic,900italic,900',
+    'boxicons.min.css': 'https://unpkg.com/boxicons@2.1.2/css/'
+                        'boxicons.min.css',
+    'jquery.slim.min.js': 'https://code.jquery.com/jquery-3.2.1.slim.min.js',
+    'popper.min.js': 'https://cdnjs.cloudflare.com/ajax/libs/popper.js/'
+                     '1.12.9/umd/popper.min.js',
+    'bootstrap.min.js': 'https://maxcdn.bootstrapcdn.com/bootstrap/4.0.0/'
+                        'js/bootstrap.min.js',
+}
+# Google Fonts отдаёт woff2 только современным браузерам
+USER_AGENT = ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+DOWNLOAD_TIMEOUT = 30
+
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def download(url):
+    response = requests.get(
+        url, headers={'User-Agent': USER_AGENT}, timeout=DOWNLOAD_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.content
+
+
+def localize_css(css, base_url, directory):
+    """Скачивает файлы из url(...) в directory/fonts и ссылается на них."""
+    downloaded = {}
+
+    def replace(match):
+        target = match.group(2)
+        if target.startswith(('data:', '#')):
+            return match.group(0)
+        parts = urlsplit(urljoin(base_url, target))
+        source = parts._replace(fragment='').geturl()
+        name = posixpath.basename(parts.path)
+        if source not in downloaded:
+            write(os.path.join(directory, 'fonts', name), download(source))
+            downloaded[source] = name
+        fragment = f'#{parts.fragment}' if parts.fragment else ''
+        return f'url("fonts/{name}{fragment}")'
+
+    return CSS_URL.sub(replace, css)
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as asset:
+        asset.write(content)
+
+
+def fetch_assets(directory):
+    """Скачивает VENDOR_ASSETS в directory; возвращает их имена."""
+    for name, url in VENDOR_ASSETS.items():
+        content = download(url)
+        if name.endswith('.css'):
+            content = localize_css(
+                content.decode(), url, directory
+            ).encode()
+        write(os.path.join(directory, name), content)
+    return list(VENDOR_ASSETS)
+
+
+def check_vendor_assets(app_configs, **kwargs):
+    """Ошибка, если LOCAL_VENDOR_ASSETS включён, а файлы не скачаны."""
+    if not settings.LOCAL_VENDOR_ASSETS:
+        return []
+    directory = os.path.join(settings.STATICFILES_DIRS[0], VENDOR_DIR)
+    missing = [
+        name for name in VENDOR_ASSETS
+        if not os.path.exists(os.path.join(directory, name))
+    ]
+    if not missing:
+        return []
+    return [checks.Error(
+        f'LOCAL_VENDOR_ASSETS включён, но в {directory} нет файлов: '
+        f'{", ".join(missing)}',
+        hint='Запустите manage.py fetch_assets перед collectstatic.',
+        id='core.E001',
+    )]
@@ -0,0 +1,35 @@
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import timing
+
+
+class TimedTemplate(Template):
+    """Шаблон, время рендера которого попадает в замеры запроса."""
+
+    def render(self, context=None, request=None):
+        timings = timing.current()
+        if timings is None:
+            return super().render(context, request)
+        # render() может вызываться из тегов шаблона, внешний вызов
+        # уже учитывает время вложенных.
+        timings.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_depth -= 1
+            if not timings.template_depth:
+                timings.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates с замером времени рендера шаблонов."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
@@ -0,0 +1,213 @@
+"""Кеширование страниц с инвалидацией по номерам поколений.
+
+Ключ закешированной страницы содержит текущие номера поколений
+её областей (например, «posts»). Изменение данных увеличивает
+номер поколения, и следующие запросы сразу идут мимо старых
+записей, поэтому сами страницы можно хранить долго.
+
+Те же номера дают дешёвые ETag и Last-Modified: condition_by_generation
+отвечает 304 Not Modified, не обращаясь к базе и не рендеря шаблон.
+Ответ с временными данными (mark_temporary) не кешируется совсем.
+Пока реплики могут не знать о последнем изменении областей
+(REPLICA_MAX_LAG), страница читается из основной базы: иначе под
+новым поколением закешировалась бы старая страница.
+"""
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import add_never_cache_headers
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from . import routers
+
+GENERATION_KEY = 'generation:{}'
+MODIFIED_KEY = 'modified:{}'
+
+_local = threading.local()
+
+
+def _initial_generation():
+    # Если ключ поколения вытеснен из кеша, новое значение не должно
+    # совпасть с уже использованным, поэтому начинаем со времени.
+    return int(time.time() * 1000)
+
+
+def get_generations(scopes):
+    """Номера поколений для списка областей."""
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for scope, key in zip(scopes, keys):
+        if key not in generations:
+            if cache.add(key, _initial_generation(), None):
+                cache.set(MODIFIED_KEY.format(scope), time.time(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generation(*scopes):
+    """Делает устаревшими все страницы, зависящие от областей."""
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_generation(), None)
+    now = time.time()
+    cache.set_many(
+        {MODIFIED_KEY.format(scope): now for scope in scopes}, None
+    )
+
+
+def bump_generation_on_commit(*scopes):
+    """bump_generation сейчас и ещё раз после фиксации транзакции.
+
+    Между этими моментами параллельный запрос видит новое поколение,
+    но ещё не изменения, и может закешировать под ним старую страницу
+    или ETag; второе увеличение делает такие записи недоступными.
+    """
+    bump_generation(*scopes)
+    transaction.on_commit(lambda: bump_generation(*scopes))
+
+
+def mark_temporary():
+    """В текущем ответе временные данные, например заглушка миниатюры.
+
+    Такой ответ не кешируется ни на сервере, ни в браузере и не получает
+    ETag: когда данные появятся, поколения областей могут не измениться.
+    """
+    _local.temporary = True
+
+
+def _uncached_if_temporary(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        _local.temporary = False
+        response = view(request, *args, **kwargs)
+        if _local.temporary:
+            add_never_cache_headers(response)
+        return response
+    return wrapper
+
+
+def _scope_names(scopes, request, kwargs):
+    """Названия областей для запроса.
+
+    Область — строка формата с аргументами view и {user} (имя
+    текущего пользователя) или функция (request, **kwargs).
+    """
+    names = []
+    for scope in scopes:
+        if callable(scope):
+            names.append(scope(request, **kwargs))
+        elif '{user}' in scope:
+            names.append(scope.format(
+                user=request.user.get_username(), **kwargs
+            ))
+        else:
+            names.append(scope.format(**kwargs))
+    return names
+
+
+def _read_fresh_data(names, modified=None):
+    """Недавно изменённые области читаются из основной базы.
+
+    modified — уже прочитанные из кеша времена изменения областей;
+    если время какой-то области неизвестно, она считается изменённой.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return
+    if modified is None:
+        modified = cache.get_many(
+            [MODIFIED_KEY.format(name) for name in names]
+        )
+    if (
+        len(modified) < len(names)
+        or max(modified.values(), default=0)
+        > time.time() - settings.REPLICA_MAX_LAG
+    ):
+        routers.read_from_primary()
+
+
+def _viewer(request):
+    """id вошедшего пользователя из сессии, без запроса к базе."""
+    session = getattr(request, 'session', None)
+    return session.get(SESSION_KEY) if session is not None else None
+
+
+def cache_page_by_generation(timeout, *scopes):
+    """cache_page, ключ которого зависит от поколений областей.
+
+    В названиях областей можно ссылаться на аргументы view:
+    'profile:{username}'. Страница кешируется отдельно для каждого
+    вошедшего пользователя и одна на всех анонимных: шапка и кнопки
+    подписки зависят от того, кто смотрит.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            names = _scope_names(scopes, request, kwargs)
+            generations = get_generations(names)
+            _read_fresh_data(names)
+            key_prefix = '{}.{}.{}'.format(
+                view.__name__,
+                '.'.join(map(str, generations)),
+                request.user.pk or 0,
+            )
+            return cache_page(timeout, key_prefix=key_prefix)(
+                _uncached_if_temporary(view)
+            )(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def condition_by_generation(*scopes):
+    """ETag и Last-Modified по поколениям областей.
+
+    ETag зависит от поколений, адреса и пользователя, Last-Modified —
+    время последнего изменения областей, если оно ещё в кеше.
+    """
+    def validators(request, kwargs):
+        if not hasattr(request, '_generation_validators'):
+            names = _scope_names(scopes, request, kwargs)
+            key = '{}|{}|{}'.format(
+                get_generations(names),
+                request.get_full_path(),
+                _viewer(request),
+            )
+            modified = cache.get_many(
+                [MODIFIED_KEY.format(name) for name in names]
+            )
+            _read_fresh_data(names, modified)
+            request._generation_validators = (
+                hashlib.md5(key.encode()).hexdigest(),
+                datetime.fromtimestamp(
+                    max(modified.values()), timezone.utc
+                ) if len(modified) == len(names) else None,
+            )
+        return request._generation_validators
+
+    def decorator(view):
+        conditional = condition(
+            etag_func=lambda request, *args, **kwargs:
+                validators(request, kwargs)[0],
+            last_modified_func=lambda request, *args, **kwargs:
+                validators(request, kwargs)[1],
+        )(_uncached_if_temporary(view))
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if 'no-store' in response.get('Cache-Control', ''):
+                del response['ETag']
+                del response['Last-Modified']
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,56 @@
+"""Обёртка над cache backend со счётчиками попаданий и промахов.
+
+Каждый слой кеша (страницы, сессии, фрагменты) настраивается
+отдельным алиасом в CACHES с BACKEND 'core.cache_backends.StatsCache'.
+Настоящий backend указывается в WRAPPED, имя слоя — в LAYER.
+Попадания и промахи чтений записываются в замеры текущего запроса.
+"""
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.utils.module_loading import import_string
+
+from . import timing
+
+_MISSING = object()
+
+
+class StatsCache:
+    def __init__(self, location, params):
+        params = dict(params)
+        backend = import_string(params.pop('WRAPPED'))
+        self.layer = params.pop('LAYER', 'default')
+        self._cache = backend(location, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def _record(self, hits, misses):
+        timings = timing.current()
+        if timings is not None:
+            timings.cache_lookup(self.layer, hits, misses)
+
+    def get(self, key, default=None, version=None):
+        value = self._cache.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._record(0, 1)
+            return default
+        self._record(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self._cache.get_many(keys, version=version)
+        self._record(len(values), len(keys) - len(values))
+        return values
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, version=version)
+        if value is None:
+            if callable(default):
+                default = default()
+            if default is not None:
+                self._cache.add(key, default, timeout=timeout, version=version)
+                return self._cache.get(key, default, version=version)
+        return value
+
+    def __contains__(self, key):
+        return self._cache.has_key(key)
@@ -0,0 +1,21 @@
+"""Настройка новых соединений с базой данных."""
+from django.conf import settings
+
+
+def pragma_statements(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Выполняет SQLITE_PRAGMAS в каждом новом соединении с SQLite.
+
+    Запросы идут мимо execute_wrapper и не попадают в замеры запроса.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    cursor = connection.connection.cursor()
+    try:
+        for statement in pragma_statements(settings.SQLITE_PRAGMAS):
+            cursor.execute(statement)
+    finally:
+        cursor.close()
@@ -0,0 +1,139 @@
+import importlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.db import pragma_statements
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'text TEXT, pub_date REAL)',
+    'CREATE INDEX post_author_pub_date ON post (author_id, pub_date)',
+)
+AUTHORS = 100
+
+
+class Workload:
+    """Читатели и писатели на одном файле SQLite в течение seconds."""
+
+    def __init__(self, path, pragmas, persistent, seconds):
+        self.path = path
+        self.pragmas = pragma_statements(pragmas)
+        self.persistent = persistent
+        self.seconds = seconds
+        self.lock = threading.Lock()
+        self.reads = self.writes = self.errors = 0
+
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        for statement in self.pragmas:
+            connection.execute(statement)
+        return connection
+
+    def read(self, connection, number):
+        connection.execute(
+            'SELECT id, text FROM post WHERE author_id = ? '
+            'ORDER BY pub_date DESC LIMIT 10', (number % AUTHORS,)
+        ).fetchall()
+
+    def write(self, connection, number):
+        with connection:
+            connection.execute(
+                'INSERT INTO post (author_id, text, pub_date) '
+                'VALUES (?, ?, ?)',
+                (number % AUTHORS, 'текст ' * 20, time.time()),
+            )
+
+    def worker(self, operation, counter):
+        deadline = time.perf_counter() + self.seconds
+        connection = self.connect() if self.persistent else None
+        done = errors = number = 0
+        while time.perf_counter() < deadline:
+            number += 1
+            current = connection or self.connect()
+            try:
+                operation(current, number)
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+            finally:
+                if connection is None:
+                    current.close()
+        if connection is not None:
+            connection.close()
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + done)
+            self.errors += errors
+
+    def run(self, readers, writers):
+        threads = [
+            threading.Thread(target=self.worker, args=(self.read, 'reads'))
+            for _ in range(readers)
+        ] + [
+            threading.Thread(target=self.worker, args=(self.write, 'writes'))
+            for _ in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность SQLite при одновременных '
+            'чтении и записи с настройками по умолчанию и боевыми')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=1)
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument(
+            '--profile', default='yatube.settings_production',
+            help='Модуль настроек, из которого берутся SQLITE_PRAGMAS'
+        )
+
+    def handle(self, *args, **options):
+        tuned = importlib.import_module(options['profile']).SQLITE_PRAGMAS
+        profiles = (
+            ('по умолчанию', {}, False),
+            (options['profile'], tuned, True),
+        )
+        self.stdout.write(
+            f'{"профиль":<30} {"чтений/с":>10} {"записей/с":>10} '
+            f'{"ошибок":>8}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for index, (name, pragmas, persistent) in enumerate(profiles):
+                path = os.path.join(directory, f'bench_{index}.sqlite3')
+                self.fill(path, pragmas, options['rows'])
+                workload = Workload(
+                    path, pragmas, persistent, options['seconds']
+                )
+                workload.run(options['readers'], options['writers'])
+                self.stdout.write(
+                    f'{name:<30} '
+                    f'{workload.reads / options["seconds"]:>10.0f} '
+                    f'{workload.writes / options["seconds"]:>10.0f} '
+                    f'{workload.errors:>8}'
+                )
+
+    def fill(self, path, pragmas, rows):
+        """Создаёт базу; journal_mode=wal сохраняется в самом файле."""
+        connection = sqlite3.connect(path)
+        for statement in pragma_statements(pragmas):
+            connection.execute(statement)
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.executemany(
+                'INSERT INTO post (author_id, text, pub_date) '
+                'VALUES (?, ?, ?)',
+                ((number % AUTHORS, 'текст ' * 20, number)
+                 for number in range(rows)),
+            )
+        connection.close()
@@ -0,0 +1,22 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from requests import RequestException
+
+from core.assets import VENDOR_DIR, fetch_assets
+
+
+class Command(BaseCommand):
+    help = ('Скачивает Bootstrap, jQuery, шрифты и иконки в static/vendor '
+            'для LOCAL_VENDOR_ASSETS; запускать перед collectstatic')
+
+    def handle(self, *args, **options):
+        directory = os.path.join(settings.STATICFILES_DIRS[0], VENDOR_DIR)
+        try:
+            names = fetch_assets(directory)
+        except RequestException as error:
+            raise CommandError(f'Не удалось скачать файлы: {error}')
+        for name in names:
+            self.stdout.write(f'{VENDOR_DIR}/{name}')
+        self.stdout.write(self.style.SUCCESS(f'Файлы сохранены в {directory}'))
@@ -0,0 +1,264 @@
+import json
+import logging
+import mimetypes
+import os
+import random
+import time
+from collections import namedtuple
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+from . import routers, timing
+
+logger = logging.getLogger('core.timing')
+
+
+class ServerTimingMiddleware:
+    """Замеры запроса в заголовке Server-Timing и в логе.
+
+    Считает число SQL-запросов, время БД, рендера шаблонов и общее,
+    а также попадания и промахи по слоям кеша.
+    Медленные запросы (дольше SLOW_REQUEST_MS) с вероятностью
+    SLOW_REQUEST_SAMPLE_RATE пишутся в лог вместе со всем SQL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        keep_sql = random.random() < settings.SLOW_REQUEST_SAMPLE_RATE
+        timings = timing.start_request(keep_sql)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timings.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            timing.finish_request()
+        total = time.perf_counter() - start
+        response['Server-Timing'] = ', '.join((
+            'db;dur={:.1f};desc="{} queries"'.format(
+                timings.db_time * 1000, timings.queries
+            ),
+            'tpl;dur={:.1f}'.format(timings.template_time * 1000),
+            *(
+                'cache-{};desc="{} hit, {} miss"'.format(layer, hits, misses)
+                for layer, (hits, misses) in timings.cache_stats.items()
+            ),
+            'total;dur={:.1f}'.format(total * 1000),
+        ))
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timings.queries,
+            'db_ms': round(timings.db_time * 1000, 1),
+            'template_ms': round(timings.template_time * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+            'cache': {
+                layer: {'hits': hits, 'misses': misses}
+                for layer, (hits, misses) in timings.cache_stats.items()
+            },
+        }
+        logger.info(json.dumps(record))
+        if keep_sql and total * 1000 >= settings.SLOW_REQUEST_MS:
+            record['sql'] = [
+                {'ms': round(duration * 1000, 2), 'sql': sql,
+                 'params': repr(params)}
+                for duration, sql, params in timings.sql
+            ]
+            logger.warning(json.dumps(record))
+        return response
+
+
+class ReplicaMiddleware:
+    """Выбор базы для чтения на время запроса.
+
+    GET и HEAD читают с реплик. Если запрос что-то записал в базу,
+    пользователь ещё PRIMARY_STICKY_SECONDS секунд читает из основной
+    базы (срок хранится в cookie) и видит свои изменения, даже если
+    реплики отстают.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            sticky_until = float(
+                request.COOKIES.get(settings.PRIMARY_STICKY_COOKIE, 0)
+            )
+        except ValueError:
+            sticky_until = 0
+        routers.start_request(
+            request.method in ('GET', 'HEAD') and sticky_until < time.time()
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.finish_request()
+        if wrote:
+            response.set_cookie(
+                settings.PRIMARY_STICKY_COOKIE,
+                str(time.time() + settings.PRIMARY_STICKY_SECONDS),
+                max_age=settings.PRIMARY_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+StaticFile = namedtuple('StaticFile', 'path content_type variants immutable')
+
+# Порядок предпочтения заранее сжатых вариантов
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding с ненулевым q; * — все остальные."""
+    weights = {}
+    for item in header.split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding.lower()] = weight
+    accepted = {coding for coding, weight in weights.items() if weight > 0}
+    if '*' in accepted:
+        accepted.update(
+            encoding for encoding, _ in ENCODINGS if encoding not in weights
+        )
+    return accepted
+
+
+def file_etag(stat):
+    return '"{:x}-{:x}"'.format(int(stat.st_mtime), stat.st_size)
+
+
+class StaticFilesMiddleware:
+    """Отдаёт статику и медиа, не доходя до сессий, авторизации и view.
+
+    Файлы STATIC_ROOT индексируются при запуске процесса, поэтому после
+    collectstatic процесс нужно перезапустить. Имена с хешем из манифеста
+    кешируются браузером навсегда, остальные — на STATIC_MAX_AGE;
+    сжатые .br и .gz выбираются по Accept-Encoding. Медиа читаются
+    с диска при каждом запросе (или отдаются веб-сервером по
+    X-Accel-Redirect, если задан MEDIA_ACCEL_PREFIX).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.static_files = self.index_static()
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD'):
+            path = request.path_info
+            if path in self.static_files:
+                return self.serve_static(request, self.static_files[path])
+            if settings.MEDIA_URL and path.startswith(settings.MEDIA_URL):
+                response = self.serve_media(
+                    request, path[len(settings.MEDIA_URL):]
+                )
+                if response is not None:
+                    return response
+        return self.get_response(request)
+
+    def index_static(self):
+        root = settings.STATIC_ROOT
+        if not root or not os.path.isdir(root):
+            return {}
+        hashed = set()
+        manifest = os.path.join(root, 'staticfiles.json')
+        if os.path.exists(manifest):
+            with open(manifest) as manifest_file:
+                hashed.update(json.load(manifest_file)['paths'].values())
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                    continue
+                path = os.path.join(directory, name)
+                url_name = os.path.relpath(path, root).replace(os.sep, '/')
+                files[settings.STATIC_URL + url_name] = StaticFile(
+                    path,
+                    mimetypes.guess_type(name)[0]
+                    or 'application/octet-stream',
+                    {
+                        encoding: path + suffix
+                        for encoding, suffix in ENCODINGS
+                        if os.path.exists(path + suffix)
+                    },
+                    url_name in hashed,
+                )
+        return files
+
+    def serve_static(self, request, static_file):
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        encoding, path = next(
+            (
+                (encoding, static_file.variants[encoding])
+                for encoding, _ in ENCODINGS
+                if encoding in static_file.variants and encoding in accepted
+            ),
+            (None, static_file.path),
+        )
+        response = self.file_response(
+            request, path, static_file.content_type,
+            IMMUTABLE if static_file.immutable
+            else f'public, max-age={settings.STATIC_MAX_AGE}',
+        )
+        if static_file.variants:
+            response['Vary'] = 'Accept-Encoding'
+        if encoding and response.status_code == 200:
+            response['Content-Encoding'] = encoding
+        return response
+
+    def serve_media(self, request, name):
+        try:
+            path = safe_join(settings.MEDIA_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        content_type = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        cache_control = f'public, max-age={settings.MEDIA_MAX_AGE}'
+        if settings.MEDIA_ACCEL_PREFIX:
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + name
+            response['Cache-Control'] = cache_control
+            return response
+        return self.file_response(request, path, content_type, cache_control)
+
+    def file_response(self, request, path, content_type, cache_control):
+        stat = os.stat(path)
+        etag = file_etag(stat)
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(
+                open(path, 'rb'), content_type=content_type
+            )
+            response['Last-Modified'] = http_date(stat.st_mtime)
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
@@ -0,0 +1,82 @@
+"""Публикация и ожидание событий внутри процесса.
+
+События с возрастающими id хранятся в кольцевом буфере, поэтому
+подписчик после переподключения получает пропущенное по последнему
+id. Ждать событий можно из потока (long-poll в WSGI) и из цикла
+событий asyncio (SSE в ASGI): публикация будит каждого ожидающего
+один раз, проверка своих тем — уже на стороне подписчика.
+Между процессами события не передаются.
+"""
+import asyncio
+import threading
+import time
+from collections import deque, namedtuple
+
+Event = namedtuple('Event', 'id topics data')
+
+
+class Broker:
+    def __init__(self, size):
+        self.events = deque(maxlen=size)
+        self.last_id = 0
+        self.condition = threading.Condition()
+        self.waiters = set()
+
+    def publish(self, topics, data):
+        with self.condition:
+            self.last_id += 1
+            self.events.append(Event(self.last_id, frozenset(topics), data))
+            self.condition.notify_all()
+            waiters, self.waiters = self.waiters, set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(wake, future)
+
+    def since(self, last_id, topics):
+        """События по темам topics с id больше last_id, по порядку."""
+        with self.condition:
+            return self._since(last_id, topics)
+
+    def _since(self, last_id, topics):
+        found = []
+        for event in reversed(self.events):
+            if event.id <= last_id:
+                break
+            if event.topics & topics:
+                found.append(event)
+        return found[::-1]
+
+    def wait(self, last_id, topics, timeout):
+        """Новые события или пустой список через timeout секунд."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                events = self._since(last_id, topics)
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                self.condition.wait(remaining)
+
+    async def wait_async(self, last_id, topics, timeout):
+        """То же, что wait, без занятого потока."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            with self.condition:
+                events = self._since(last_id, topics)
+                remaining = deadline - loop.time()
+                if events or remaining <= 0:
+                    return events
+                waiter = (loop, loop.create_future())
+                self.waiters.add(waiter)
+            try:
+                await asyncio.wait_for(waiter[1], remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self.condition:
+                    self.waiters.discard(waiter)
+
+
+def wake(future):
+    if not future.done():
+        future.set_result(None)
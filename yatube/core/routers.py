@@ -0,0 +1,66 @@
+"""Чтение с реплик базы данных.
+
+ReplicaMiddleware разрешает читать с реплик только запросам, которые
+ничего не меняют, от пользователя, который недавно ничего не записывал.
+Команды, фоновые потоки и всё остальное вне запросов работают
+с основной базой. Кеш страниц переключает запрос на основную базу
+(read_from_primary), если его данные изменились недавно.
+"""
+import random
+import threading
+
+from django.conf import settings
+
+# Таблицы кешей должны быть согласованы сразу, поэтому они всегда
+# в основной базе, а запись в них не считается изменением данных.
+PRIMARY_ONLY_APPS = {'django_cache', 'thumbnail'}
+
+_local = threading.local()
+
+
+def start_request(use_replicas):
+    _local.use_replicas = use_replicas
+    _local.wrote = False
+
+
+def read_from_primary():
+    """До конца запроса читать из основной базы."""
+    _local.use_replicas = False
+
+
+def finish_request():
+    """Завершает запрос; True, если в нём что-то записывалось в базу."""
+    wrote = getattr(_local, 'wrote', False)
+    _local.use_replicas = False
+    _local.wrote = False
+    return wrote
+
+
+class ReplicaRouter:
+    """Чтение — со случайной реплики из DATABASE_REPLICAS, запись — в default.
+
+    После первой записи запрос до конца читает из основной базы.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            settings.DATABASE_REPLICAS
+            and getattr(_local, 'use_replicas', False)
+            and model._meta.app_label not in PRIMARY_ONLY_APPS
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_ONLY_APPS:
+            _local.use_replicas = False
+            _local.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на репликах те же данные, что и в основной базе
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # реплики получают схему вместе с данными из основной базы
+        return db == 'default'
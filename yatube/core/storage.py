@@ -0,0 +1,96 @@
+"""Хранилище статики для collectstatic.
+
+Кроме имён с хешем содержимого (ManifestStaticFilesStorage) файлы
+CSS и JS минифицируются, а текстовые файлы сжимаются заранее в .gz
+и, если установлен пакет brotli, в .br. StaticFilesMiddleware отдаёт
+сжатый вариант по Accept-Encoding.
+"""
+import gzip
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.map',
+                '.ico', '.eot', '.ttf')
+# сжатый файл, который меньше исходного менее чем на 5%, не сохраняется
+MIN_COMPRESSION = 0.95
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_SPACE = re.compile(r'\s+')
+CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(css):
+    css = CSS_COMMENT.sub('', css)
+    css = CSS_SPACE.sub(' ', css)
+    css = CSS_PUNCTUATION.sub(r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js):
+    """Осторожная минификация: без отступов, пустых строк и строк-комментариев.
+
+    Переносы строк сохраняются, чтобы не сломать автоматическую
+    расстановку точек с запятой.
+    """
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(
+        line for line in lines if line and not line.startswith('//')
+    ) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def compressed_variants(content):
+    """{суффикс: сжатое содержимое} для вариантов, которые стоит хранить."""
+    variants = {'.gz': gzip.compress(content, 9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content)
+    return {
+        suffix: data for suffix, data in variants.items()
+        if len(data) < len(content) * MIN_COMPRESSION
+    }
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = {}
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name:
+                hashed_names[name] = hashed_name
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name, hashed_name in hashed_names.items():
+            self.minify(hashed_name)
+            for path in (name, hashed_name):
+                self.compress(path)
+
+    def replace(self, name, content):
+        self.delete(name)
+        self._save(name, ContentFile(content))
+
+    def minify(self, name):
+        minifier = MINIFIERS.get(name[name.rfind('.'):])
+        if minifier is None or '.min.' in name:
+            return
+        with self.open(name) as original:
+            source = original.read().decode()
+        self.replace(name, minifier(source).encode())
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE):
+            return
+        with self.open(name) as original:
+            content = original.read()
+        for suffix, data in compressed_variants(content).items():
+            self.replace(name + suffix, data)
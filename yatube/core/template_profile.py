@@ -0,0 +1,61 @@
+"""Профиль рендера шаблонов: число рендеров и время каждого шаблона.
+
+Учитываются все вызовы Template.render, в том числе {% include %}
+и render_to_string из тегов. Родительский шаблон {% extends %}
+рендерится внутри дочернего и отдельно не выводится.
+"""
+import time
+from collections import namedtuple
+
+from django.template.base import Template
+
+TemplateStats = namedtuple('TemplateStats', 'calls total self_time')
+
+
+class TemplateProfile:
+    """На время блока with подменяет Template.render замером.
+
+    Не потокобезопасен: предназначен для команд, а не для запросов.
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self.children = []
+
+    def __enter__(self):
+        self.original = Template.render
+        profile = self
+
+        def render(template, context):
+            return profile.measure(template, context)
+
+        Template.render = render
+        return self
+
+    def __exit__(self, *exc_info):
+        Template.render = self.original
+
+    def measure(self, template, context):
+        # время вложенных рендеров копится в children[-1]
+        self.children.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self.original(template, context)
+        finally:
+            total = time.perf_counter() - start
+            nested = self.children.pop()
+            if self.children:
+                self.children[-1] += total
+            name = template.origin.template_name or '<строка>'
+            calls, total_time, self_time = self.stats.get(
+                name, (0, 0.0, 0.0)
+            )
+            self.stats[name] = TemplateStats(
+                calls + 1, total_time + total, self_time + total - nested
+            )
+
+    def report(self):
+        """Строки (имя, статистика) по убыванию собственного времени."""
+        return sorted(
+            self.stats.items(), key=lambda item: -item[1].self_time
+        )
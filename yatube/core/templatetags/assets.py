@@ -0,0 +1,15 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+
+from core.assets import VENDOR_ASSETS, VENDOR_DIR
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_asset(name):
+    """Адрес локальной копии стороннего файла или его адрес на CDN."""
+    if settings.LOCAL_VENDOR_ASSETS:
+        return static(f'{VENDOR_DIR}/{name}')
+    return VENDOR_ASSETS[name]
@@ -1,6 +1,36 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post
+
+from . import routers
+from .asgi import WsgiToAsgi, build_environ
+from .assets import VENDOR_ASSETS, check_vendor_assets, localize_css
+from .cache import bump_generation_on_commit, get_generations
+from .db import configure_sqlite
+from .middleware import accepted_encodings
+from .storage import minify_css
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +38,386 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class ServerTimingMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('about:author'))
+        self.assertIn('Server-Timing', response)
+        for metric in ('db;dur=', 'tpl;dur=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, response['Server-Timing'])
+
+    @override_settings(SLOW_REQUEST_MS=0, SLOW_REQUEST_SAMPLE_RATE=1)
+    def test_slow_request_logged_with_sql(self):
+        with self.assertLogs('core.timing', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['path'], '/')
+        self.assertEqual(len(record['sql']), record['queries'])
+        self.assertGreater(record['template_ms'], 0)
+
+    def test_cache_layers_hits_and_misses(self):
+        url = reverse('posts:index')
+        self.assertNotIn(
+            ' 0 miss"', self.client.get(url)['Server-Timing']
+        )
+        header = self.client.get(url)['Server-Timing']
+        self.assertIn('cache-default;desc="', header)
+        self.assertIn(' 0 miss"', header)
+
+
+class StatsCacheTest(TestCase):
+    def test_layers_share_store_with_own_prefix(self):
+        caches['fragments'].set('key', 'fragment')
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(caches['fragments'].get('key'), 'fragment')
+        self.assertEqual(
+            caches['fragments'].get_or_set('other', lambda: 'value'), 'value'
+        )
+
+
+class GenerationCacheTest(TransactionTestCase):
+    def test_bumped_again_after_commit(self):
+        before = get_generations(['scope'])
+        with transaction.atomic():
+            bump_generation_on_commit('scope')
+            during = get_generations(['scope'])
+            self.assertNotEqual(during, before)
+        self.assertNotEqual(get_generations(['scope']), during)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.addCleanup(routers.finish_request)
+
+    def test_reads_from_replica_until_first_write(self):
+        routers.start_request(use_replicas=True)
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertTrue(routers.finish_request())
+
+    def test_primary_outside_requests_and_for_cache_tables(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        routers.start_request(use_replicas=True)
+        cache_model = mock.Mock()
+        cache_model._meta.app_label = 'django_cache'
+        self.assertEqual(self.router.db_for_read(cache_model), 'default')
+        self.router.db_for_write(cache_model)
+        self.assertFalse(routers.finish_request())
+
+
+class ReplicaMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='writer')
+        self.client.force_login(self.user)
+
+    def replicas_allowed(self, url):
+        with mock.patch.object(
+            routers, 'start_request', wraps=routers.start_request
+        ) as start:
+            response = self.client.get(url)
+        return response, start.call_args[0][0]
+
+    def test_read_only_request_uses_replicas(self):
+        response, allowed = self.replicas_allowed(reverse('posts:index'))
+        self.assertTrue(allowed)
+        self.assertNotIn(settings.PRIMARY_STICKY_COOKIE, response.cookies)
+
+    def test_reads_stick_to_primary_after_write(self):
+        response, _ = self.replicas_allowed(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        cookie = response.cookies[settings.PRIMARY_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.PRIMARY_STICKY_SECONDS)
+        _, allowed = self.replicas_allowed(reverse('posts:index'))
+        self.assertFalse(allowed)
+        self.client.cookies[settings.PRIMARY_STICKY_COOKIE] = str(
+            time.time() - 1
+        )
+        _, allowed = self.replicas_allowed(reverse('posts:index'))
+        self.assertTrue(allowed)
+
+
+class ReplicaDatabaseTest(TransactionTestCase):
+    """Чтение с настоящей реплики — отдельного файла SQLite."""
+
+    databases = {'default', 'replica_0'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.replica_path = os.path.join(cls.directory, 'replica.sqlite3')
+        connections.databases['replica_0'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': cls.replica_path,
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica_0'].close()
+        del connections.databases['replica_0']
+        shutil.rmtree(cls.directory)
+
+    def copy_primary_to_replica(self):
+        connection.ensure_connection()
+        replica = sqlite3.connect(self.replica_path)
+        connection.connection.backup(replica)
+        replica.close()
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_MAX_LAG=0)
+    def test_reads_from_replica_writes_and_sticky_reads_on_primary(self):
+        cache.clear()
+        author = User.objects.create_user(username='writer')
+        self.client.force_login(User.objects.create_user(username='reader'))
+        Post.objects.create(author=author, text='Пост на реплике')
+        self.copy_primary_to_replica()
+        Post.objects.create(author=author, text='Пост после копии')
+        url = reverse('posts:profile', args=[author.username])
+        response = self.client.get(url)
+        self.assertContains(response, 'Пост на реплике')
+        self.assertNotContains(response, 'Пост после копии')
+        self.client.post(reverse('posts:profile_follow', args=[
+            author.username
+        ]))
+        self.assertTrue(Follow.objects.using('default').exists())
+        self.assertFalse(Follow.objects.using('replica_0').exists())
+        response = self.client.get(url)
+        self.assertContains(response, 'Пост после копии')
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'])
+    def test_recent_changes_not_cached_from_replica(self):
+        """Сразу после изменения страница и ETag — по основной базе."""
+        cache.clear()
+        author = User.objects.create_user(username='writer')
+        self.copy_primary_to_replica()
+        Post.objects.create(author=author, text='Пост после копии')
+        url = reverse('posts:profile', args=[author.username])
+        response = self.client.get(url)
+        self.assertContains(response, 'Пост после копии')
+        with override_settings(REPLICA_MAX_LAG=0):
+            self.assertContains(self.client.get(url), 'Пост после копии')
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+
+class SqliteTuningTest(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -4321})
+    def test_pragmas_applied_to_new_connection(self):
+        configure_sqlite(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -4321)
+
+    def test_benchmark_reports_both_profiles(self):
+        out = StringIO()
+        call_command(
+            'bench_sqlite', seconds=0.1, rows=100, readers=1, stdout=out
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('yatube.settings_production', lines[2])
+
+
+class WsgiToAsgiTest(TestCase):
+    def call(self, scope, body=b''):
+        messages = [
+            {'type': 'http.request', 'body': body, 'more_body': False}
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        application = WsgiToAsgi(WSGIHandler(), threads=1)
+        asyncio.run(application(scope, receive, send))
+        application.executor.shutdown()
+        return sent
+
+    def test_response_sent_from_thread_pool(self):
+        sent = self.call({
+            'type': 'http', 'method': 'GET', 'path': reverse('about:author'),
+            'query_string': b'', 'headers': [(b'host', b'testserver')],
+        })
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], HTTPStatus.OK)
+        self.assertIn(
+            b'text/html; charset=utf-8', dict(sent[0]['headers']).values()
+        )
+        self.assertFalse(sent[-1].get('more_body'))
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn('</html>'.encode(), body)
+
+    def test_environ_from_scope(self):
+        environ = build_environ({
+            'type': 'http', 'method': 'POST', 'path': '/группа/',
+            'query_string': b'page=2',
+            'headers': [
+                (b'content-type', b'text/plain'),
+                (b'accept', b'text/html'), (b'accept', b'*/*'),
+                (b'cookie', b'a=1'), (b'cookie', b'b=2'),
+            ],
+        }, b'text')
+        self.assertEqual(environ['PATH_INFO'].encode('latin-1').decode(),
+                         '/группа/')
+        self.assertEqual(environ['QUERY_STRING'], 'page=2')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
+        self.assertEqual(environ['wsgi.input'].read(), b'text')
+
+
+class StaticPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.media_root = tempfile.mkdtemp()
+        cls.overridden = override_settings(
+            STATIC_ROOT=cls.static_root,
+            MEDIA_ROOT=cls.media_root,
+            STATICFILES_STORAGE=(
+                'core.storage.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        cls.overridden.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(cls.static_root, 'staticfiles.json')) as f:
+            cls.main_css = json.load(f)['paths']['css/main.css']
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.overridden.disable()
+        shutil.rmtree(cls.static_root)
+        shutil.rmtree(cls.media_root)
+        super().tearDownClass()
+
+    def test_collectstatic_minifies_and_compresses(self):
+        path = os.path.join(self.static_root, self.main_css)
+        with open(path, 'rb') as hashed:
+            content = hashed.read()
+        self.assertNotIn(b'\n', content)
+        with gzip.open(path + '.gz') as compressed:
+            self.assertEqual(compressed.read(), content)
+
+    def test_hashed_static_served_compressed_and_immutable(self):
+        url = settings.STATIC_URL + self.main_css
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        response = self.client.get(
+            url, HTTP_ACCEPT_ENCODING='gzip, br',
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        response = self.client.get(settings.STATIC_URL + 'css/main.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_encoding_refused_with_zero_quality(self):
+        self.assertEqual(accepted_encodings('br;q=0, gzip'), {'gzip'})
+        self.assertEqual(accepted_encodings('*, gzip;q=0'), {'*', 'br'})
+        url = settings.STATIC_URL + self.main_css
+        for header, encoding in (
+            ('br;q=0, gzip', 'gzip'),
+            ('gzip;q=0', None),
+            ('*;q=0.5, gzip;q=0', None),
+            ('GZIP;q=0.8', 'gzip'),
+        ):
+            with self.subTest(header=header):
+                response = self.client.get(
+                    url, HTTP_ACCEPT_ENCODING=header
+                )
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+
+    def test_media_served_from_media_root(self):
+        with open(os.path.join(self.media_root, 'file.txt'), 'w') as media:
+            media.write('медиа')
+        response = self.client.get(settings.MEDIA_URL + 'file.txt')
+        self.assertEqual(b''.join(response.streaming_content),
+                         'медиа'.encode())
+        self.assertEqual(
+            response['Cache-Control'],
+            f'public, max-age={settings.MEDIA_MAX_AGE}',
+        )
+        response = self.client.get(settings.MEDIA_URL + '../manage.py')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        with self.settings(MEDIA_ACCEL_PREFIX='/protected/'):
+            response = self.client.get(settings.MEDIA_URL + 'file.txt')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/file.txt')
+        self.assertEqual(response.content, b'')
+
+    def test_minify_css(self):
+        self.assertEqual(
+            minify_css('/* шапка */\nh1 ,\nh2 {\n  color: red;\n}\n'),
+            'h1,h2{color: red}',
+        )
+
+
+class VendorAssetsTest(TestCase):
+    def test_css_references_downloaded_next_to_it(self):
+        css = (
+            '@font-face{src:url(../fonts/icons.eot?#iefix),'
+            'url("https://fonts.example/roboto.woff2")}'
+            '.i{background:url(data:image/png;base64,AA==)}'
+        )
+        with tempfile.TemporaryDirectory() as directory, mock.patch(
+            'core.assets.download', return_value=b'font'
+        ) as download:
+            localized = localize_css(
+                css, 'https://cdn.example/icons/css/icons.css', directory
+            )
+            self.assertEqual(
+                sorted(os.listdir(os.path.join(directory, 'fonts'))),
+                ['icons.eot', 'roboto.woff2'],
+            )
+        self.assertEqual(download.call_args_list, [
+            mock.call('https://cdn.example/icons/fonts/icons.eot'),
+            mock.call('https://fonts.example/roboto.woff2'),
+        ])
+        self.assertIn('url("fonts/icons.eot#iefix")', localized)
+        self.assertIn('url("fonts/roboto.woff2")', localized)
+        self.assertIn('url(data:image/png;base64,AA==)', localized)
+
+    def test_vendor_asset_tag(self):
+        template = Template(
+            "{% load assets %}{% vendor_asset 'bootstrap.min.css' %}"
+        )
+        self.assertEqual(
+            template.render(Context()), VENDOR_ASSETS['bootstrap.min.css']
+        )
+        with self.settings(LOCAL_VENDOR_ASSETS=True):
+            self.assertEqual(
+                template.render(Context()),
+                settings.STATIC_URL + 'vendor/bootstrap.min.css',
+            )
+
+    def test_missing_vendor_files_fail_checks(self):
+        self.assertEqual(check_vendor_assets(None), [])
+        with tempfile.TemporaryDirectory() as directory, self.settings(
+            LOCAL_VENDOR_ASSETS=True, STATICFILES_DIRS=[directory]
+        ):
+            errors = check_vendor_assets(None)
+            self.assertEqual([error.id for error in errors], ['core.E001'])
+            self.assertIn('bootstrap.min.css', errors[0].msg)
+            os.makedirs(os.path.join(directory, 'vendor'))
+            for name in VENDOR_ASSETS:
+                open(os.path.join(directory, 'vendor', name), 'w').close()
+            self.assertEqual(check_vendor_assets(None), [])
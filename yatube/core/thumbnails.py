@@ -0,0 +1,96 @@
+"""Генерация миниатюр sorl-thumbnail вне запроса.
+
+PregeneratingThumbnailBackend не режет картинку в запросе: если
+миниатюры ещё нет в key-value store sorl, тег {% thumbnail %}
+получает заглушку, а сама миниатюра ставится в очередь пула
+потоков. Те же задачи ставятся заранее при сохранении поста.
+Страница с заглушкой не кешируется (mark_temporary), а созданная
+миниатюра меняет поколение объекта с картинкой («post:<pk>»).
+"""
+from django.conf import settings
+from django.templatetags.static import static
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import DummyImageFile, ImageFile
+
+from . import workers
+from .cache import bump_generation, mark_temporary
+
+
+class PlaceholderImageFile(DummyImageFile):
+    """Заглушка нужного размера, пока миниатюра не готова."""
+
+    @property
+    def url(self):
+        return static(settings.THUMBNAIL_PLACEHOLDER)
+
+
+def generate(file_, geometry_string, **options):
+    """Создаёт миниатюру в текущем потоке."""
+    return default.backend.generate(file_, geometry_string, **options)
+
+
+def image_scope(file_):
+    """Область кеша объекта, которому принадлежит картинка: «post:<pk>»."""
+    instance = getattr(file_, 'instance', None)
+    if instance is None or instance.pk is None:
+        return None
+    return f'{instance._meta.model_name}:{instance.pk}'
+
+
+def generate_and_publish(name, geometry_string, scope, **options):
+    """Создаёт миниатюру; если её ещё не было, делает scope устаревшим."""
+    thumbnail = default.backend.thumbnail_file(
+        name, geometry_string, dict(options)
+    )
+    if default.kvstore.get(thumbnail):
+        return
+    generate(name, geometry_string, **options)
+    if scope is not None:
+        bump_generation(scope)
+
+
+def schedule(file_, geometry_string, **options):
+    """Ставит миниатюру в очередь после фиксации транзакции."""
+    name = str(file_)
+    scope = image_scope(file_)
+    workers.submit_on_commit(
+        ('thumbnail', name, geometry_string, tuple(sorted(options.items()))),
+        lambda: generate_and_publish(
+            name, geometry_string, scope, **options
+        ),
+    )
+
+
+class PregeneratingThumbnailBackend(ThumbnailBackend):
+
+    def generate(self, file_, geometry_string, **options):
+        return super().get_thumbnail(file_, geometry_string, **options)
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        cached = default.kvstore.get(self.thumbnail_file(
+            file_, geometry_string, dict(options)
+        ))
+        if cached:
+            return cached
+        schedule(file_, geometry_string, **options)
+        mark_temporary()
+        return PlaceholderImageFile(geometry_string)
+
+    def thumbnail_file(self, file_, geometry_string, options):
+        """Будущий файл миниатюры с теми же опциями, что у sorl."""
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
@@ -0,0 +1,52 @@
+"""Счётчики времени текущего запроса.
+
+ServerTimingMiddleware заводит RequestTimings на время запроса,
+а обёртка SQL-запросов, шаблонный backend и кеш дописывают в него
+свои замеры.
+"""
+import threading
+import time
+
+_local = threading.local()
+
+
+class RequestTimings:
+    def __init__(self, keep_sql=False):
+        self.keep_sql = keep_sql
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.sql = []
+        self.cache_stats = {}
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            if self.keep_sql:
+                self.sql.append((duration, sql, params))
+
+    def cache_lookup(self, layer, hits, misses):
+        stats = self.cache_stats.setdefault(layer, [0, 0])
+        stats[0] += hits
+        stats[1] += misses
+
+
+def start_request(keep_sql=False):
+    _local.timings = RequestTimings(keep_sql)
+    return _local.timings
+
+
+def finish_request():
+    _local.timings = None
+
+
+def current():
+    """Замеры текущего запроса или None вне запроса."""
+    return getattr(_local, 'timings', None)
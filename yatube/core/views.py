@@ -1,3 +1,4 @@
+from django.http import JsonResponse
 from django.shortcuts import render
 
 
@@ -14,4 +15,10 @@ def permission_denied(request, exception):
 
 
 def csrf_failure(request, reason=''):
-    return render(request, 'core/403csrf.html')
+    """Отказ проверки CSRF: для API — JSON, как остальные его ошибки."""
+    match = request.resolver_match
+    if match is not None and 'api' in match.namespaces:
+        return JsonResponse(
+            {'detail': f'Ошибка проверки CSRF: {reason}'}, status=403
+        )
+    return render(request, 'core/403csrf.html', status=403)
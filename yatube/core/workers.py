@@ -0,0 +1,58 @@
+"""Общий пул потоков для фоновой работы вне запроса.
+
+Задачи ставятся после фиксации транзакции и не дублируются:
+пока задача с тем же ключом в очереди, повторная не ставится.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = {}
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS,
+                thread_name_prefix='background',
+            )
+        return _executor
+
+
+def _run(key, func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась ошибкой', key)
+    finally:
+        with _lock:
+            _pending.pop(key, None)
+        connections.close_all()
+
+
+def submit_on_commit(key, func, *args):
+    """Выполняет func(*args) в пуле после фиксации транзакции."""
+    def submit():
+        executor = get_executor()
+        with _lock:
+            if key in _pending:
+                return
+            _pending[key] = executor.submit(_run, key, func, args)
+
+    transaction.on_commit(submit)
+
+
+def wait_pending(timeout=None):
+    """Ждёт завершения уже поставленных задач."""
+    with _lock:
+        futures = list(_pending.values())
+    wait(futures, timeout)
@@ -1,2 +1,31 @@
 POSTS_NUMBER = 10
 TESTS_NUMBER = 15
+CURSOR_PARAM = 'cursor'
+PARTIAL_PARAM = 'partial'
+SINCE_PARAM = 'since'
+CURSOR_ORDERING = ('-pub_date', '-id')
+COUNT_CACHE_TIMEOUT = 60 * 5
+FEED_FANOUT_LIMIT = 1000
+FEED_BACKFILL_SIZE = 1000
+FEED_BATCH_SIZE = 500
+FEED_POPULAR_TIMEOUT = 60 * 5
+FEED_ORDERING = ('-pub_date', '-post_id')
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+COMMENTS_NUMBER = 50
+COMMENTS_CURSOR_PARAM = 'comments'
+COMMENTS_ORDERING = ('-created', '-id')
+# Должны совпадать с параметрами {% thumbnail %} в шаблонах постов
+POST_THUMBNAIL_GEOMETRY = '960x339'
+POST_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+SEARCH_BATCH_SIZE = 1000
+SEARCH_TOTAL_TIMEOUT = 60 * 5
+CARD_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+# Поля автора, которые выводятся в карточке поста
+CARD_AUTHOR_FIELDS = {'username', 'first_name', 'last_name'}
+TRANSFER_BATCH_SIZE = 1000
+FOLLOWS_CACHE_TIMEOUT = 60 * 60
+POST_AUTHOR_CACHE_TIMEOUT = 60 * 60 * 24
+LIVE_BUFFER_SIZE = 1000
+LIVE_POLL_TIMEOUT = 25
+LIVE_HEARTBEAT = 15
+LIVE_STREAM_LIFETIME = 60 * 5
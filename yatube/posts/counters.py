@@ -0,0 +1,76 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются сигналами моделей Post, Comment и Follow
+атомарными UPDATE ... SET x = x + 1, а команда rebuild_counters
+пересчитывает их целиком по таблицам.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def change_user_counter(user_id, field, delta):
+    """Меняет счётчик пользователя на delta.
+
+    Строка счётчиков создаётся только при увеличении: при удалении
+    пользователя каскад может уже удалить её, и воскрешать её нельзя.
+    """
+    changed = UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+    if changed or delta < 0:
+        return
+    with transaction.atomic():
+        stats, created = UserStats.objects.get_or_create(
+            user_id=user_id, defaults={field: delta}
+        )
+        if not created:
+            UserStats.objects.filter(pk=stats.pk).update(
+                **{field: F(field) + delta}
+            )
+
+
+def change_comments_counter(post_id, delta):
+    """Меняет счётчик комментариев поста на delta."""
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def _count(queryset, field):
+    """Подзапрос количества строк queryset для внешней строки."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('user_id')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def rebuild_counters():
+    """Пересчитывает все счётчики по таблицам."""
+    with transaction.atomic():
+        UserStats.objects.bulk_create(
+            [
+                UserStats(user_id=user_id)
+                for user_id in User.objects.filter(
+                    stats__isnull=True
+                ).values_list('id', flat=True).iterator()
+            ],
+            batch_size=500,
+        )
+        UserStats.objects.update(
+            posts_count=_count(Post.objects.all(), 'author'),
+            followers_count=_count(Follow.objects.all(), 'author'),
+            following_count=_count(Follow.objects.all(), 'user'),
+        )
+        Post.objects.update(comments_count=Coalesce(Subquery(
+            Comment.objects.filter(post=OuterRef('pk'))
+            .order_by()
+            .values('post')
+            .annotate(total=Count('pk'))
+            .values('total')
+        ), 0))
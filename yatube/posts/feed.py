@@ -0,0 +1,135 @@
+"""Лента подписок с раздачей постов при записи (fan-out on write).
+
+Новый пост сразу раскладывается по лентам подписчиков автора
+(таблица FeedEntry), и страница подписок читает один диапазон
+по индексу (user, -pub_date). Для популярных авторов, у которых
+подписчиков больше FEED_FANOUT_LIMIT, раздача не делается:
+их посты подмешиваются в ленту при чтении (fan-out on read).
+Такой автор отмечается в UserStats.fanout_on_read, и его посты
+подмешиваются и дальше, даже если подписчиков станет меньше: иначе
+посты, написанные без раздачи, пропали бы из лент.
+"""
+from django.core.cache import cache
+from django.db.models import Q
+
+from .constants import (CURSOR_ORDERING, FEED_BACKFILL_SIZE, FEED_BATCH_SIZE,
+                        FEED_FANOUT_LIMIT, FEED_ORDERING,
+                        FEED_POPULAR_TIMEOUT)
+from .models import FeedEntry, Follow, Post, UserStats
+
+
+def load_popular_authors():
+    """Отмечает новых популярных авторов и возвращает всех отмеченных."""
+    authors = dict(UserStats.objects.filter(
+        Q(fanout_on_read=True) | Q(followers_count__gte=FEED_FANOUT_LIMIT)
+    ).values_list('user_id', 'fanout_on_read'))
+    new = [user_id for user_id, marked in authors.items() if not marked]
+    if new:
+        UserStats.objects.filter(user_id__in=new).update(fanout_on_read=True)
+    return set(authors)
+
+
+def popular_authors():
+    """Множество id авторов, чьи посты читаются без раздачи."""
+    return cache.get_or_set(
+        'feed_popular_authors', load_popular_authors, FEED_POPULAR_TIMEOUT
+    )
+
+
+def is_popular(author_id):
+    """Автор со слишком большим числом подписчиков для раздачи."""
+    return author_id in popular_authors()
+
+
+def fan_out_post(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    if is_popular(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_posts(posts):
+    """Раскладывает пачку постов по лентам подписчиков их авторов."""
+    popular = popular_authors()
+    posts = [post for post in posts if post.author_id not in popular]
+    followers = {}
+    for user_id, author_id in Follow.objects.filter(
+        author_id__in={post.author_id for post in posts}
+    ).values_list('user_id', 'author_id').iterator():
+        followers.setdefault(author_id, []).append(user_id)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for post in posts
+            for user_id in followers.get(post.author_id, ())
+        ),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def add_author_to_feed(user_id, author_id):
+    """Заполняет ленту последними постами автора после подписки."""
+    if is_popular(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')[:FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def remove_author_from_feed(user_id, author_id):
+    """Убирает посты автора из ленты после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def feed_posts(user):
+    """Лента подписок пользователя: (queryset, ordering) для пагинации.
+
+    Обычно это записи FeedEntry пользователя: страница читается одним
+    диапазоном индекса (user, -pub_date), посты подтягиваются через
+    select_related (см. entry_posts). Если пользователь подписан на
+    популярных авторов, их посты подмешиваются из таблицы постов.
+    Значения курсоров в обоих порядках совпадают (pub_date и id поста).
+    """
+    popular = popular_authors()
+    if popular:
+        popular = Follow.objects.filter(
+            user=user, author_id__in=popular
+        ).values_list('author_id', flat=True)
+    if not popular:
+        entries = FeedEntry.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        )
+        return entries.order_by(*FEED_ORDERING), FEED_ORDERING
+    posts = Post.objects.select_related('group', 'author').filter(
+        Q(id__in=FeedEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=list(popular))
+    )
+    return posts.order_by(*CURSOR_ORDERING), CURSOR_ORDERING
+
+
+def entry_posts(rows):
+    """Посты страницы ленты: записи FeedEntry заменяются их постами."""
+    return [
+        row.post if isinstance(row, FeedEntry) else row for row in rows
+    ]
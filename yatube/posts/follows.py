@@ -0,0 +1,64 @@
+"""Состояние подписок пользователя.
+
+Множество id авторов, на которых подписан пользователь, читается
+одним запросом и хранится в кеше до изменения его подписок, поэтому
+проверка подписки для целой страницы авторов не ходит в базу.
+Подписка и отписка — по одному запросу, повторы безопасны благодаря
+ограничениям unique_follows и non_self_follow.
+"""
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .constants import FOLLOWS_CACHE_TIMEOUT
+from .models import Follow
+
+FOLLOWS_KEY = 'follows:{}'
+
+
+def followed_authors(user):
+    """Множество id авторов, на которых подписан пользователь."""
+    if not user.is_authenticated:
+        return frozenset()
+    return cache.get_or_set(
+        FOLLOWS_KEY.format(user.pk),
+        lambda: frozenset(Follow.objects.filter(
+            user_id=user.pk
+        ).values_list('author_id', flat=True)),
+        FOLLOWS_CACHE_TIMEOUT,
+    )
+
+
+def following_among(user, author_ids):
+    """Те из author_ids, на кого подписан пользователь."""
+    return followed_authors(user).intersection(author_ids)
+
+
+def is_following(user, author):
+    return author.pk in followed_authors(user)
+
+
+def forget(user_id):
+    """Сбрасывает закешированные подписки пользователя.
+
+    Ключ удаляется сейчас и ещё раз после фиксации транзакции:
+    до неё параллельный запрос может снова закешировать старые подписки.
+    """
+    key = FOLLOWS_KEY.format(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def follow(user, author):
+    """Подписывает на автора, возвращает False, если подписка уже есть."""
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user, author):
+    """Отписывает от автора, возвращает False, если подписки не было."""
+    deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+    return bool(deleted)
@@ -0,0 +1,175 @@
+"""Уведомления о новых постах и комментариях.
+
+Сигналы после коммита публикуют события в broker внутри процесса.
+Клиенты получают их long-poll запросом (views.live_events), потоком
+SSE из Django (views.live_stream) или, при запуске через yatube.asgi,
+потоком SSE из stream, который не занимает поток на соединение.
+Карточки новых постов страница запрашивает у своей ленты с ?since=
+(views.render_posts).
+"""
+import asyncio
+import json
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib import auth
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections
+
+from core.asgi import build_environ
+from core.pubsub import Broker
+
+from . import follows
+from .constants import LIVE_BUFFER_SIZE, LIVE_HEARTBEAT, LIVE_STREAM_LIFETIME
+
+broker = Broker(LIVE_BUFFER_SIZE)
+
+TOPIC_PARAMS = ('group', 'author', 'post')
+SSE_HEADERS = (
+    ('Content-Type', 'text/event-stream'),
+    ('Cache-Control', 'no-cache'),
+    # nginx не должен буферизовать поток
+    ('X-Accel-Buffering', 'no'),
+)
+
+
+def publish_post(post):
+    topics = ['posts', f'author:{post.author_id}']
+    if post.group_id:
+        topics.append(f'group:{post.group_id}')
+    broker.publish(topics, {
+        'type': 'post',
+        'id': post.pk,
+        'author': post.author_id,
+        'group': post.group_id,
+    })
+
+
+def publish_comment(comment):
+    broker.publish([f'post:{comment.post_id}'], {
+        'type': 'comment',
+        'id': comment.pk,
+        'post': comment.post_id,
+    })
+
+
+def topics_for(params, user):
+    """Темы из параметров запроса: posts, group, author, post и feed."""
+    topics = {
+        f'{name}:{params[name]}' for name in TOPIC_PARAMS
+        if params.get(name, '').isdigit()
+    }
+    if params.get('posts'):
+        topics.add('posts')
+    if params.get('feed'):
+        topics.update(
+            f'author:{author_id}'
+            for author_id in follows.followed_authors(user)
+        )
+    return frozenset(topics)
+
+
+def last_event_id(value):
+    """id, после которого нужны события; по умолчанию — только новые.
+
+    id событий свои у каждого процесса и после перезапуска начинаются
+    с нуля, поэтому id больше последнего в broker (от другого процесса
+    или до перезапуска) означает «только новые».
+    """
+    try:
+        return min(int(value), broker.last_id)
+    except (TypeError, ValueError):
+        return broker.last_id
+
+
+def event_dict(event):
+    return {'id': event.id, **event.data}
+
+
+def format_events(events):
+    return ''.join(
+        f'id: {event.id}\nevent: {event.data["type"]}\n'
+        f'data: {json.dumps(event_dict(event))}\n\n'
+        for event in events
+    ).encode()
+
+
+def sse_stream(last_id, topics):
+    """Поток SSE в WSGI; через LIVE_STREAM_LIFETIME браузер переподключится.
+
+    Каждое соединение держит поток, поэтому много клиентов лучше
+    обслуживать через yatube.asgi.
+    """
+    deadline = time.monotonic() + LIVE_STREAM_LIFETIME
+    yield b'retry: 3000\n\n'
+    while time.monotonic() < deadline:
+        events = broker.wait(last_id, topics, LIVE_HEARTBEAT)
+        if events:
+            last_id = events[-1].id
+        yield format_events(events) or b': ping\n\n'
+
+
+def request_topics(request):
+    """Темы запроса вне middleware: пользователь берётся из сессии."""
+    try:
+        engine = import_module(settings.SESSION_ENGINE)
+        request.session = engine.SessionStore(
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        )
+        return topics_for(request.GET, auth.get_user(request))
+    finally:
+        close_old_connections()
+
+
+async def stream(scope, receive, send):
+    """ASGI-приложение потока SSE.
+
+    Пока событий нет, соединение — это одна ожидающая корутина.
+    """
+    request = WSGIRequest(build_environ(scope, b''))
+    loop = asyncio.get_running_loop()
+    topics = await loop.run_in_executor(None, request_topics, request)
+    if not topics:
+        await send({'type': 'http.response.start', 'status': 400,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'no topics'})
+        return
+    last_id = last_event_id(
+        request.META.get('HTTP_LAST_EVENT_ID', request.GET.get('last_id'))
+    )
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (name.lower().encode(), value.encode())
+            for name, value in SSE_HEADERS
+        ],
+    })
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        while True:
+            waiting = asyncio.ensure_future(
+                broker.wait_async(last_id, topics, LIVE_HEARTBEAT)
+            )
+            await asyncio.wait(
+                {waiting, disconnect}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnect.done():
+                waiting.cancel()
+                return
+            events = waiting.result()
+            if events:
+                last_id = events[-1].id
+            await send({
+                'type': 'http.response.body',
+                'body': format_events(events) or b': ping\n\n',
+                'more_body': True,
+            })
+    finally:
+        disconnect.cancel()
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
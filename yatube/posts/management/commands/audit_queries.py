@@ -0,0 +1,114 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core import timing
+from posts.models import Follow, Post
+
+NO_CACHE = {
+    alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    for alias in ('default', 'sessions', 'fragments')
+}
+
+
+def audited_pages():
+    """Адреса страниц и пользователь, от имени которого их открывать."""
+    post = Post.objects.filter(group__isnull=False).first()
+    follow = Follow.objects.select_related('user').first()
+    if post is None or follow is None:
+        raise CommandError(
+            'Нужны пост в группе и подписка: выполните seed_yatube'
+        )
+    return (
+        ('posts:index', reverse('posts:index'), None),
+        ('posts:group_list',
+         reverse('posts:group_list', args=[post.group.slug]), None),
+        ('posts:profile',
+         reverse('posts:profile', args=[post.author.username]), None),
+        ('posts:post_detail',
+         reverse('posts:post_detail', args=[post.pk]), None),
+        ('posts:follow_index', reverse('posts:follow_index'), follow.user),
+        ('posts:search', reverse('posts:search') + '?q=' + (
+            post.text.split() or ['пост']
+        )[0], None),
+    )
+
+
+def is_full_scan(plan):
+    """Строка плана, читающая таблицу целиком, без индекса."""
+    if connection.vendor == 'sqlite':
+        return (
+            plan.startswith('SCAN')
+            and 'INDEX' not in plan
+            and 'subquery' not in plan
+        )
+    if connection.vendor == 'postgresql':
+        return 'Seq Scan' in plan
+    return False
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{connection.ops.explain_query_prefix()} {sql}', params
+        )
+        rows = cursor.fetchall()
+    # в SQLite описание шага — последняя колонка EXPLAIN QUERY PLAN
+    return [str(row[-1]) for row in rows]
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN для запросов основных страниц '
+            'и отмечает полные просмотры таблиц')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail', action='store_true',
+            help='Завершиться с ошибкой, если есть полные просмотры'
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Выводить планы всех запросов'
+        )
+
+    def handle(self, *args, **options):
+        full_scans = 0
+        for name, url, user in audited_pages():
+            queries = self.capture(url, user)
+            self.stdout.write(f'{name} {url}: запросов {len(queries)}')
+            for sql, params in queries:
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                plan = explain(sql, params)
+                scans = [step for step in plan if is_full_scan(step)]
+                full_scans += bool(scans)
+                if scans:
+                    self.stdout.write(self.style.WARNING(
+                        f'  полный просмотр: {"; ".join(scans)}\n    {sql}'
+                    ))
+                elif options['plans']:
+                    self.stdout.write(f'  {"; ".join(plan)}\n    {sql}')
+        message = f'Запросов с полным просмотром: {full_scans}'
+        if full_scans and options['fail']:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def capture(self, url, user):
+        """SQL и параметры запросов страницы, без кешей."""
+        recorder = timing.RequestTimings(keep_sql=True)
+        with override_settings(CACHES=NO_CACHE):
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+            with connection.execute_wrapper(recorder.execute_wrapper):
+                response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url} вернул {response.status_code}')
+        seen = set()
+        queries = []
+        for _, sql, params in recorder.sql:
+            if sql not in seen:
+                seen.add(sql)
+                queries.append((sql, params))
+        return queries
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template import Context, Engine
+from django.template.backends.django import get_installed_libraries
+from django.test import override_settings
+from django.utils import timezone
+
+from posts.models import Post, User
+from posts.templatetags.post_cards import CARD_TEMPLATE
+
+from .audit_queries import NO_CACHE
+
+FILE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+LOADERS = (
+    ('без кеша', FILE_LOADERS),
+    ('cached', [('django.template.loaders.cached.Loader', FILE_LOADERS)]),
+)
+LOAD_TAG = '{% load thumbnail %}'
+
+
+def bench_templates(engine):
+    """Лента из include карточки в цикле и та же лента с карточкой внутри.
+
+    Третий вариант — настоящий posts/cards.html с {% post_card %}.
+    """
+    card = engine.get_template(CARD_TEMPLATE).source
+    return {
+        'bench/include.html': (
+            "{% for post in page_obj %}"
+            f"{{% include '{CARD_TEMPLATE}' %}}<hr>{{% endfor %}}"
+        ),
+        'bench/inline.html': (
+            f'{LOAD_TAG}{{% for post in page_obj %}}'
+            f'{card.replace(LOAD_TAG, "")}<hr>{{% endfor %}}'
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время рендера ленты с include карточек, '
+            'со встроенными карточками и с {% post_card %} '
+            'при загрузчике шаблонов с кешем и без')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        page = [
+            Post(
+                pk=number + 1,
+                text=f'Текст поста {number} ' * 10,
+                pub_date=now,
+                author=User(pk=number + 1, username=f'author_{number}'),
+            )
+            for number in range(options['posts'])
+        ]
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(CACHES=NO_CACHE):
+            results = {}
+            for loader_name, loaders in LOADERS:
+                engine = Engine(
+                    dirs=[directory, *settings.TEMPLATES[0]['DIRS']],
+                    loaders=loaders,
+                    libraries=get_installed_libraries(),
+                )
+                for name, source in bench_templates(engine).items():
+                    path = os.path.join(directory, name)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, 'w') as template_file:
+                        template_file.write(source)
+                for name in (*bench_templates(engine), 'posts/cards.html'):
+                    results[name, loader_name] = self.measure(
+                        engine, name, page, options['repeat']
+                    )
+        self.stdout.write(f'{"шаблон, мс на рендер":<24}' + ''.join(
+            f'{loader_name:>12}' for loader_name, _ in LOADERS
+        ))
+        for name in dict.fromkeys(name for name, _ in results):
+            self.stdout.write(f'{name:<24}' + ''.join(
+                f'{results[name, loader_name]:>12.3f}'
+                for loader_name, _ in LOADERS
+            ))
+
+    def measure(self, engine, name, page, repeat):
+        """Среднее время get_template и рендера, как в запросе, в мс."""
+        start = time.perf_counter()
+        for _ in range(repeat):
+            engine.get_template(name).render(Context({'page_obj': page}))
+        return (time.perf_counter() - start) * 1000 / repeat
@@ -0,0 +1,34 @@
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.transfer import copy_media, export_posts, post_images
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии '
+            'и подписки в JSONL')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для выгрузки')
+        parser.add_argument(
+            '--media', help='Каталог, куда скопировать картинки постов'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Количество потоков копирования картинок'
+        )
+
+    def handle(self, *args, **options):
+        with open(options['path'], 'w', encoding='utf-8') as stream:
+            total = export_posts(stream)
+        self.stdout.write(f'Выгружено записей: {total}')
+        if options['media']:
+            copied = copy_media(
+                post_images(),
+                source=Post.image.field.storage,
+                target=FileSystemStorage(options['media']),
+                workers=options['workers'],
+            )
+            self.stdout.write(f'Скопировано картинок: {copied}')
+        self.stdout.write(self.style.SUCCESS('Выгрузка завершена'))
@@ -0,0 +1,46 @@
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+
+from posts.constants import TRANSFER_BATCH_SIZE
+from posts.transfer import Importer
+
+
+class Command(BaseCommand):
+    help = ('Загружает JSONL из export_posts; прерванная загрузка '
+            'продолжается с места остановки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки')
+        parser.add_argument(
+            '--media', help='Каталог с картинками постов из выгрузки'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Количество потоков копирования картинок'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=TRANSFER_BATCH_SIZE,
+            help='Количество записей в одной транзакции'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать загрузку заново, забыв о прогрессе'
+        )
+
+    def handle(self, *args, **options):
+        progress_path = options['path'] + '.progress'
+        if options['restart'] and os.path.exists(progress_path):
+            os.remove(progress_path)
+        importer = Importer(
+            progress_path,
+            batch_size=options['batch_size'],
+            media=options['media'] and FileSystemStorage(options['media']),
+            workers=options['workers'],
+        )
+        with open(options['path'], encoding='utf-8') as lines:
+            counts = importer.run(lines)
+        for model_name, count in counts.items():
+            self.stdout.write(f'{model_name}: {count}')
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
@@ -0,0 +1,172 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Post, User
+
+DEFAULT_MIX = 'index=40,profile=15,follow=15,post_detail=25,add_comment=5'
+SAMPLE_SIZE = 1000
+
+
+def percentile(values, share):
+    """Значение, меньше которого доля share отсортированных values."""
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def plan_sizes(requests, workers):
+    """Число запросов каждого потока: остаток достаётся первым потокам.
+
+    Потоков без запросов нет, поэтому их может быть меньше workers.
+    """
+    share, extra = divmod(requests, workers)
+    return [share + 1] * extra + [share] * (workers - extra if share else 0)
+
+
+def sample_ids(queryset, size, rnd):
+    """Случайные существующие id без сортировки всей таблицы."""
+    bounds = queryset.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return []
+    candidates = [
+        rnd.randint(bounds['low'], bounds['high']) for _ in range(size)
+    ]
+    return list(queryset.filter(id__in=candidates).values_list(
+        'id', flat=True
+    ))
+
+
+class Command(BaseCommand):
+    help = ('Нагружает приложение смесью запросов через WSGI в том же '
+            'процессе и выводит пропускную способность и перцентили')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Количество потоков с отдельными клиентами'
+        )
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help='Веса запросов: index, profile, follow, post_detail, '
+                 'add_comment'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            mix = {
+                name: int(weight) for name, weight in (
+                    item.split('=') for item in options['mix'].split(',')
+                )
+            }
+        except ValueError:
+            raise CommandError(f'Неверный формат --mix: {options["mix"]}')
+        unknown = set(mix) - {
+            name[len('request_'):] for name in dir(self)
+            if name.startswith('request_')
+        }
+        if unknown:
+            raise CommandError(f'Неизвестные запросы: {", ".join(unknown)}')
+        if options['requests'] < 1 or options['workers'] < 1:
+            raise CommandError('--requests и --workers должны быть больше 0')
+        rnd = random.Random(options['seed'])
+        self.post_ids = sample_ids(Post.objects.all(), SAMPLE_SIZE, rnd)
+        self.users = list(User.objects.filter(
+            id__in=sample_ids(User.objects.all(), SAMPLE_SIZE, rnd)
+        ))
+        if not self.post_ids or not self.users:
+            raise CommandError('Нет данных: сначала выполните seed_yatube')
+        plans = [
+            rnd.choices(list(mix), weights=list(mix.values()), k=size)
+            for size in plan_sizes(options['requests'], options['workers'])
+        ]
+        workers = self.workers = len(plans)
+        start = time.perf_counter()
+        if workers == 1:
+            results = [self.replay(plans[0], options['seed'])]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(
+                    self.replay, plans, range(options['seed'],
+                                              options['seed'] + workers)
+                ))
+        elapsed = time.perf_counter() - start
+        self.report([item for result in results for item in result], elapsed)
+
+    def replay(self, plan, seed):
+        """Выполняет запросы плана одним клиентом, возвращает замеры."""
+        rnd = random.Random(seed)
+        client = Client()
+        client.force_login(rnd.choice(self.users))
+        results = []
+        try:
+            for name in plan:
+                request = getattr(self, f'request_{name}')
+                started = time.perf_counter()
+                response = request(client, rnd)
+                results.append((
+                    name, time.perf_counter() - started, response.status_code
+                ))
+        finally:
+            if self.workers > 1:
+                connection.close()
+        return results
+
+    def request_index(self, client, rnd):
+        return client.get(reverse('posts:index'))
+
+    def request_profile(self, client, rnd):
+        return client.get(reverse(
+            'posts:profile', args=[rnd.choice(self.users).username]
+        ))
+
+    def request_follow(self, client, rnd):
+        return client.get(reverse('posts:follow_index'))
+
+    def request_post_detail(self, client, rnd):
+        return client.get(reverse(
+            'posts:post_detail', args=[rnd.choice(self.post_ids)]
+        ))
+
+    def request_add_comment(self, client, rnd):
+        return client.post(
+            reverse('posts:add_comment', args=[rnd.choice(self.post_ids)]),
+            {'text': 'Комментарий из нагрузочного теста'},
+        )
+
+    def report(self, results, elapsed):
+        self.stdout.write(
+            f'Запросов: {len(results)} за {elapsed:.2f} с, '
+            f'{len(results) / elapsed:.1f} запросов/с'
+        )
+        self.stdout.write(
+            f'{"запрос":<12} {"число":>6} {"ошибок":>6} {"p50":>8} '
+            f'{"p95":>8} {"p99":>8} {"max":>8}'
+        )
+        names = sorted({name for name, _, _ in results})
+        for name in names + ['всего']:
+            rows = [
+                (duration, status) for request, duration, status in results
+                if name in (request, 'всего')
+            ]
+            if not rows:
+                continue
+            durations = sorted(duration * 1000 for duration, _ in rows)
+            errors = sum(status >= 400 for _, status in rows)
+            self.stdout.write(
+                f'{name:<12} {len(rows):>6} {errors:>6} '
+                + ' '.join(
+                    f'{value:>8.1f}' for value in (
+                        percentile(durations, 0.5),
+                        percentile(durations, 0.95),
+                        percentile(durations, 0.99),
+                        durations[-1],
+                    )
+                )
+            )
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import thumbnails
+from posts.constants import POST_THUMBNAIL_GEOMETRY, POST_THUMBNAIL_OPTIONS
+from posts.models import Post
+
+
+def generate(name):
+    try:
+        thumbnails.generate(
+            name, POST_THUMBNAIL_GEOMETRY, **POST_THUMBNAIL_OPTIONS
+        )
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры картинок всех постов в несколько потоков'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Количество потоков'
+        )
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).iterator()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            total = sum(1 for _ in pool.map(generate, images))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {total}'
+        ))
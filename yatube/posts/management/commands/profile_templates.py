@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from core.template_profile import TemplateProfile
+
+from .audit_queries import NO_CACHE, audited_pages
+
+
+class Command(BaseCommand):
+    help = ('Рендерит основные страницы без кешей и выводит для каждого '
+            'шаблона и include число рендеров и время')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=10,
+            help='Сколько раз открывать каждую страницу'
+        )
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        for name, url, user in audited_pages():
+            with override_settings(CACHES=NO_CACHE), \
+                    TemplateProfile() as profile:
+                client = Client()
+                if user is not None:
+                    client.force_login(user)
+                for _ in range(repeat):
+                    client.get(url)
+            self.stdout.write(f'{name} {url}')
+            self.stdout.write(
+                f'  {"шаблон":<32} {"рендеров":>9} {"всего, мс":>10} '
+                f'{"свои, мс":>10}'
+            )
+            for template, stats in profile.report():
+                self.stdout.write(
+                    f'  {template:<32} {stats.calls / repeat:>9g} '
+                    f'{stats.total * 1000 / repeat:>10.2f} '
+                    f'{stats.self_time * 1000 / repeat:>10.2f}'
+                )
@@ -0,0 +1,238 @@
+import io
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from core.cache import bump_generation
+from posts import feed, search
+from posts.counters import rebuild_counters
+from posts.models import Comment, Follow, Group, Post, User
+from posts.transfer import chunks, original_dates, reset_sequences
+
+SEED_PERIOD = timedelta(days=365)
+SEED_PASSWORD = 'yatube-seed'
+
+
+class PowerLaw:
+    """Случайные индексы 0..size-1 с хвостом по закону Парето.
+
+    Маленькие индексы выпадают чаще всего; permutation разносит
+    «популярные» индексы по всему диапазону.
+    """
+
+    def __init__(self, rnd, size, alpha):
+        self.rnd = rnd
+        self.size = size
+        self.alpha = alpha
+        self.step = next(
+            step for step in (7919, 104729, 1299709, 1)
+            if size % step
+        ) if size > 1 else 1
+
+    def __call__(self):
+        rank = int(self.rnd.paretovariate(self.alpha)) - 1
+        return min(rank, self.size - 1) * self.step % self.size
+
+
+class Command(BaseCommand):
+    help = ('Создаёт большой набор пользователей, групп, постов, '
+            'комментариев и подписок для замеров')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного распределения популярности'
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.2,
+            help='Доля постов с картинкой'
+        )
+        parser.add_argument(
+            '--image-files', type=int, default=50,
+            help='Количество разных файлов картинок'
+        )
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rnd = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.sentences = [self.fake.sentence() for _ in range(1000)]
+        self.now = timezone.now()
+        user_ids = self.create_users()
+        group_ids = self.create_groups()
+        self.create_follows(user_ids)
+        # популярных авторов раздача постов находит по счётчикам подписчиков
+        rebuild_counters()
+        with original_dates():
+            post_ids = self.create_posts(user_ids, group_ids)
+            self.create_comments(user_ids, post_ids)
+        rebuild_counters()
+        bump_generation('posts')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(user_ids)}, групп '
+            f'{len(group_ids)}, постов {len(post_ids)}'
+        ))
+
+    def text(self, low, high):
+        return ' '.join(self.rnd.sample(
+            self.sentences, self.rnd.randint(low, high)
+        ))
+
+    def create_users(self):
+        prefix = self.options['prefix']
+        password = make_password(SEED_PASSWORD)
+        for batch in chunks(range(self.options['users']),
+                            self.options['batch_size']):
+            User.objects.bulk_create(
+                [
+                    User(
+                        username=f'{prefix}_user_{index}',
+                        first_name=self.fake.first_name(),
+                        last_name=self.fake.last_name(),
+                        password=password,
+                    )
+                    for index in batch
+                ],
+                ignore_conflicts=True,
+            )
+        user_ids = list(User.objects.filter(
+            username__startswith=f'{prefix}_user_'
+        ).order_by('id').values_list('id', flat=True))
+        self.stdout.write(f'Пользователи: {len(user_ids)}')
+        return user_ids
+
+    def create_groups(self):
+        prefix = self.options['prefix']
+        Group.objects.bulk_create(
+            [
+                Group(
+                    title=self.fake.catch_phrase()[:200],
+                    slug=f'{prefix}-group-{index}',
+                    description=self.text(1, 3),
+                )
+                for index in range(self.options['groups'])
+            ],
+            ignore_conflicts=True,
+        )
+        return list(Group.objects.filter(
+            slug__startswith=f'{prefix}-group-'
+        ).values_list('id', flat=True))
+
+    def create_follows(self, user_ids):
+        """Подписки: у немногих авторов большинство подписчиков."""
+        if len(user_ids) < 2:
+            return
+        popularity = PowerLaw(self.rnd, len(user_ids), self.options['alpha'])
+        mean = self.options['follows']
+        total = 0
+        for batch in chunks(user_ids, self.options['batch_size']):
+            follows = set()
+            for user_id in batch:
+                count = min(
+                    len(user_ids) - 1,
+                    round(self.rnd.expovariate(1 / mean)) if mean else 0,
+                )
+                for _ in range(count):
+                    author_id = user_ids[popularity()]
+                    if author_id != user_id:
+                        follows.add((user_id, author_id))
+            Follow.objects.bulk_create(
+                (
+                    Follow(user_id=user_id, author_id=author_id)
+                    for user_id, author_id in follows
+                ),
+                ignore_conflicts=True,
+            )
+            total += len(follows)
+        self.stdout.write(f'Подписки: {total}')
+
+    def create_images(self):
+        storage = Post.image.field.storage
+        names = []
+        for index in range(self.options['image_files']):
+            image = Image.new('RGB', (960, 540), tuple(
+                self.rnd.randrange(256) for _ in range(3)
+            ))
+            content = io.BytesIO()
+            image.save(content, 'JPEG')
+            names.append(storage.save(
+                f'posts/{self.options["prefix"]}_{index}.jpg',
+                ContentFile(content.getvalue()),
+            ))
+        return names
+
+    def post_date(self, index):
+        """Посты идут равномерно за SEED_PERIOD в порядке id."""
+        return self.now - SEED_PERIOD * (
+            1 - (index + 1) / self.options['posts']
+        )
+
+    def create_posts(self, user_ids, group_ids):
+        """Посты пишут в основном активные авторы; ленты и индекс — сразу."""
+        images = self.create_images() if self.options['images'] else []
+        activity = PowerLaw(self.rnd, len(user_ids), self.options['alpha'])
+        base = Post.objects.aggregate(Max('id'))['id__max'] or 0
+        for batch in chunks(range(self.options['posts']),
+                            self.options['batch_size']):
+            posts = [
+                Post(
+                    id=base + index + 1,
+                    text=self.text(1, 6),
+                    pub_date=self.post_date(index),
+                    author_id=user_ids[activity()],
+                    group_id=self.rnd.choice(group_ids + [None]),
+                    image=(
+                        self.rnd.choice(images)
+                        if images and self.rnd.random() < self.options[
+                            'images'] else ''
+                    ),
+                )
+                for index in batch
+            ]
+            with transaction.atomic():
+                Post.objects.bulk_create(posts)
+                search.index_posts((post.id, post.text) for post in posts)
+                feed.fan_out_posts(posts)
+        reset_sequences(Post)
+        self.stdout.write(f'Посты: {self.options["posts"]}')
+        return range(base + 1, base + self.options['posts'] + 1)
+
+    def create_comments(self, user_ids, post_ids):
+        """Обсуждения: большинство комментариев у немногих постов."""
+        if not post_ids:
+            return
+        threads = PowerLaw(self.rnd, len(post_ids), self.options['alpha'])
+        for batch in chunks(range(self.options['comments']),
+                            self.options['batch_size']):
+            comments = []
+            for _ in batch:
+                index = threads()
+                age = self.now - self.post_date(index)
+                comments.append(Comment(
+                    post_id=post_ids[index],
+                    author_id=self.rnd.choice(user_ids),
+                    text=self.text(1, 2),
+                    created=self.now - age * self.rnd.random(),
+                ))
+            Comment.objects.bulk_create(comments)
+        self.stdout.write(f'Комментарии: {self.options["comments"]}')
@@ -44,9 +44,24 @@ class Post(models.Model):
         blank=True,
         help_text='Загрузите картинку'
     )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                name='post_author_pub_date_idx',
+                fields=['author', '-pub_date'],
+            ),
+            models.Index(
+                name='post_group_pub_date_idx',
+                fields=['group', '-pub_date'],
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -77,6 +92,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                name='comment_post_created_idx',
+                fields=['post', '-created'],
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -106,3 +127,112 @@ class Follow(models.Model):
                 name='non_self_follow'
             )
         ]
+        indexes = [
+            models.Index(
+                name='follow_author_user_idx',
+                fields=['author', 'user'],
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Материализованная лента подписок: пост в ленте подписчика."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_feed_entry',
+                fields=['user', 'post'],
+            ),
+        ]
+        indexes = [
+            models.Index(
+                name='feed_user_pub_date_idx',
+                fields=['user', '-pub_date'],
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.post}'
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        db_index=True
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Количество подписок',
+        default=0
+    )
+    fanout_on_read = models.BooleanField(
+        verbose_name='Посты без раздачи по лентам',
+        default=False,
+        db_index=True
+    )
+
+    def __str__(self):
+        return f'Счётчики {self.user}'
+
+
+class PostTerm(models.Model):
+    """Запись обратного индекса: основа слова в тексте поста."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='terms',
+        verbose_name='Пост'
+    )
+    term = models.CharField(
+        verbose_name='Основа слова',
+        max_length=64
+    )
+    count = models.PositiveIntegerField(
+        verbose_name='Количество вхождений',
+        default=1
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_post_term',
+                fields=['post', 'term'],
+            ),
+        ]
+        indexes = [
+            models.Index(
+                name='post_term_idx',
+                fields=['term', 'post'],
+            ),
+        ]
+
+    def __str__(self):
+        return self.term
@@ -0,0 +1,190 @@
+"""Полнотекстовый поиск по постам на собственном обратном индексе.
+
+Текст поста разбивается на слова, слова приводятся к основе
+стеммером Snowball для русского языка, и для каждой основы в
+таблице PostTerm хранится число её вхождений в пост. Индекс
+обновляется сигналами Post, а поиск ранжирует посты по TF-IDF
+одним агрегирующим запросом по индексу (term, post).
+"""
+import math
+import re
+
+from django.core.cache import cache
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+
+from .constants import SEARCH_BATCH_SIZE, SEARCH_TOTAL_TIMEOUT
+from .models import Post, PostTerm
+
+WORD_RE = re.compile(r'\w+')
+VOWELS = 'аеиоуыэюя'
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'в', 'во', 'вы', 'да', 'для', 'до', 'его', 'ее',
+    'если', 'же', 'за', 'и', 'из', 'или', 'их', 'к', 'как', 'ко', 'ли',
+    'мы', 'на', 'над', 'не', 'нет', 'ни', 'но', 'о', 'об', 'он', 'она',
+    'они', 'оно', 'от', 'по', 'под', 'при', 'с', 'со', 'так', 'то',
+    'ты', 'у', 'уже', 'что', 'это', 'я',
+))
+
+PERFECTIVE_GERUND = re.compile(
+    r'((?<=[ая])(в|вши|вшись)|(ив|ивши|ившись|ыв|ывши|ывшись))$'
+)
+REFLEXIVE = re.compile(r'(ся|сь)$')
+ADJECTIVAL = re.compile(
+    r'((?<=[ая])(ем|нн|вш|ющ|щ)|(ивш|ывш|ующ))?'
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|'
+    r'их|ых|ую|юю|ая|яя|ою|ею)$'
+)
+VERB = re.compile(
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)|'
+    r'(ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|'
+    r'ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+DERIVATIONAL = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+def _region_start(word, start):
+    """Начало R1 для start=0 или R2 для start, равного началу R1."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _cut(pattern, word):
+    return pattern.sub('', word, count=1)
+
+
+def stem(word):
+    """Основа русского слова по алгоритму Snowball."""
+    word = word.lower().replace('ё', 'е')
+    match = re.search('[{}]'.format(VOWELS), word)
+    if match is None:
+        return word
+    prefix, rv = word[:match.end()], word[match.end():]
+    r2 = _region_start(word, _region_start(word, 0)) - len(prefix)
+
+    cut = _cut(PERFECTIVE_GERUND, rv)
+    if cut == rv:
+        rv = _cut(REFLEXIVE, rv)
+        cut = _cut(ADJECTIVAL, rv)
+        if cut == rv:
+            cut = _cut(VERB, rv)
+            if cut == rv:
+                cut = _cut(NOUN, rv)
+    rv = cut
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    match = DERIVATIONAL.search(rv)
+    if match and match.start() >= r2:
+        rv = rv[:match.start()]
+
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        cut = _cut(SUPERLATIVE, rv)
+        if cut != rv:
+            rv = cut[:-1] if cut.endswith('нн') else cut
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+    return prefix + rv
+
+
+def terms(text):
+    """Основы слов текста без стоп-слов."""
+    for word in WORD_RE.findall(text.lower()):
+        if word in STOP_WORDS or (word.isdigit() and len(word) < 2):
+            continue
+        yield stem(word)[:PostTerm._meta.get_field('term').max_length]
+
+
+def term_counts(text):
+    counts = {}
+    for term in terms(text):
+        counts[term] = counts.get(term, 0) + 1
+    return counts
+
+
+def index_post(post):
+    """Перестраивает записи индекса одного поста."""
+    PostTerm.objects.filter(post=post).delete()
+    PostTerm.objects.bulk_create(
+        PostTerm(post=post, term=term, count=count)
+        for term, count in term_counts(post.text).items()
+    )
+
+
+def index_posts(posts):
+    """Добавляет в индекс посты из пар (id, текст), пачками."""
+    batch = []
+    for post_id, text in posts:
+        batch.extend(
+            PostTerm(post_id=post_id, term=term, count=count)
+            for term, count in term_counts(text).items()
+        )
+        if len(batch) >= SEARCH_BATCH_SIZE:
+            PostTerm.objects.bulk_create(batch)
+            batch = []
+    PostTerm.objects.bulk_create(batch)
+
+
+def rebuild_index():
+    """Строит индекс заново по всем постам."""
+    PostTerm.objects.all().delete()
+    index_posts(
+        Post.objects.order_by().values_list('id', 'text')
+        .iterator(chunk_size=SEARCH_BATCH_SIZE)
+    )
+
+
+def _posts_total():
+    return cache.get_or_set(
+        'search_posts_total', Post.objects.count, SEARCH_TOTAL_TIMEOUT
+    )
+
+
+def matches(query):
+    """Совпадения запроса: значения post и score по убыванию score.
+
+    Пост должен содержать все слова запроса, вес слова — TF-IDF.
+    """
+    query_terms = set(terms(query))
+    if not query_terms:
+        return PostTerm.objects.none().values('post')
+    postings = PostTerm.objects.filter(term__in=query_terms)
+    frequency = dict(
+        postings.order_by().values('term')
+        .annotate(total=Count('id')).values_list('term', 'total')
+    )
+    if len(frequency) < len(query_terms):
+        return PostTerm.objects.none().values('post')
+    total = max(_posts_total(), 1)
+    score = Sum(Case(
+        *[
+            When(term=term, then=F('count') * Value(
+                math.log(1 + total / frequency[term])
+            ))
+            for term in query_terms
+        ],
+        output_field=FloatField(),
+    ))
+    return (
+        postings.order_by().values('post')
+        .annotate(score=score, matched=Count('term'))
+        .filter(matched=len(query_terms))
+        .order_by('-score', '-post')
+    )
+
+
+def posts_for_matches(rows):
+    """Посты для страницы совпадений в порядке ранжирования."""
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [row['post'] for row in rows]
+    )
+    return [posts[row['post']] for row in rows if row['post'] in posts]
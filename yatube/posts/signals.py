@@ -0,0 +1,130 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import thumbnails
+from core.cache import bump_generation_on_commit
+
+from . import counters, feed, follows, live, search
+from .constants import (CARD_AUTHOR_FIELDS, POST_THUMBNAIL_GEOMETRY,
+                        POST_THUMBNAIL_OPTIONS)
+from .models import Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=Post)
+def on_post_created(sender, instance, created, **kwargs):
+    """Новый пост попадает в ленты подписчиков и в счётчик автора."""
+    if created:
+        counters.change_user_counter(instance.author_id, 'posts_count', 1)
+        feed.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnail(sender, instance, **kwargs):
+    """Миниатюра картинки создаётся в фоне сразу после сохранения."""
+    if instance.image:
+        thumbnails.schedule(
+            instance.image, POST_THUMBNAIL_GEOMETRY, **POST_THUMBNAIL_OPTIONS
+        )
+
+
+@receiver(post_save, sender=Post)
+def notify_new_post(sender, instance, created, **kwargs):
+    """Подписчики узнают о посте, когда он уже виден в базе."""
+    if created:
+        transaction.on_commit(lambda: live.publish_post(instance))
+
+
+@receiver(post_delete, sender=Post)
+def on_post_deleted(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_post_pages(sender, **kwargs):
+    """Закешированные ленты постов устаревают при любом изменении."""
+    bump_generation_on_commit('posts')
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_card(sender, instance, **kwargs):
+    """Правка поста делает устаревшей только его карточку."""
+    bump_generation_on_commit(f'post:{instance.pk}')
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, created, update_fields=None,
+                            **kwargs):
+    """Имя автора выводится в карточках всех его постов.
+
+    Закешированные ленты (главная, группы, профили) хранят готовые
+    карточки, поэтому устаревают вместе с ними, а имена пользователей
+    в ответах API — по области users. Сохранение других
+    полей (last_login при каждом входе) карточки не меняет, а у нового
+    пользователя постов ещё нет.
+    """
+    if created:
+        return
+    if update_fields and not set(update_fields) & CARD_AUTHOR_FIELDS:
+        return
+    bump_generation_on_commit('posts', 'users', f'user:{instance.pk}')
+
+
+@receiver(post_save, sender=Comment)
+def on_comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments_counter(instance.post_id, 1)
+
+
+@receiver(post_save, sender=Comment)
+def notify_new_comment(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: live.publish_comment(instance))
+
+
+@receiver(post_delete, sender=Comment)
+def on_comment_deleted(sender, instance, **kwargs):
+    counters.change_comments_counter(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    """Комментарии поста и счётчики комментариев в списках устарели."""
+    bump_generation_on_commit('comments', f'comments:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def on_follow_created(sender, instance, created, **kwargs):
+    """После подписки в ленту добавляются посты автора."""
+    if created:
+        counters.change_user_counter(instance.author_id, 'followers_count', 1)
+        counters.change_user_counter(instance.user_id, 'following_count', 1)
+        feed.add_author_to_feed(instance.user_id, instance.author_id)
+        invalidate_profiles(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def on_follow_deleted(sender, instance, **kwargs):
+    """После отписки посты автора убираются из ленты."""
+    counters.change_user_counter(instance.author_id, 'followers_count', -1)
+    counters.change_user_counter(instance.user_id, 'following_count', -1)
+    feed.remove_author_from_feed(instance.user_id, instance.author_id)
+    invalidate_profiles(instance)
+
+
+def invalidate_profiles(follow):
+    """Кнопка подписки и счётчики профилей зависят от подписок."""
+    follows.forget(follow.user_id)
+    bump_generation_on_commit(
+        f'profile:{follow.author.username}',
+        f'profile:{follow.user.username}',
+    )
@@ -0,0 +1,84 @@
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.template import Context
+from django.template.loaders.cached import Loader as CachedLoader
+from django.templatetags.static import static
+from django.utils.safestring import mark_safe
+
+from core.cache import get_generations
+from posts.constants import CARD_CACHE_TIMEOUT
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/article.html'
+
+
+def card_scopes(post):
+    return f'post:{post.pk}', f'user:{post.author_id}'
+
+
+def load_cards(posts):
+    """Закешированные карточки постов: {post.pk: (key, html)}.
+
+    Версии постов и авторов и сами карточки читаются двумя
+    запросами к кешу на всю страницу.
+    """
+    posts = list(posts)
+    scopes = [scope for post in posts for scope in card_scopes(post)]
+    generations = dict(zip(scopes, get_generations(scopes)))
+    keys = {
+        post.pk: 'post_card:{}:{}:{}'.format(
+            post.pk, *(generations[scope] for scope in card_scopes(post))
+        )
+        for post in posts
+    }
+    cached = caches['fragments'].get_many(keys.values())
+    return {pk: (key, cached.get(key)) for pk, key in keys.items()}
+
+
+@lru_cache(maxsize=None)
+def process_card_template(engine):
+    """Шаблон карточки на весь процесс или None без кеширующего загрузчика."""
+    if any(
+        isinstance(loader, CachedLoader) for loader in engine.template_loaders
+    ):
+        return engine.get_template(CARD_TEMPLATE)
+    return None
+
+
+def card_template(context):
+    """Шаблон карточки.
+
+    С кеширующим загрузчиком шаблон загружается один раз на процесс,
+    без него — один раз за рендер страницы, чтобы правки были видны.
+    """
+    card = process_card_template(context.template.engine)
+    if card is not None:
+        return card
+    card = context.render_context.get(CARD_TEMPLATE)
+    if card is None:
+        card = context.template.engine.get_template(CARD_TEMPLATE)
+        context.render_context[CARD_TEMPLATE] = card
+    return card
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    """Карточка поста, отрендеренная один раз на версию поста и автора."""
+    cards = context.render_context.get('post_cards')
+    if cards is None or post.pk not in cards:
+        cards = load_cards(context.get('page_obj') or [post])
+        cards.setdefault(post.pk, load_cards([post])[post.pk])
+        context.render_context['post_cards'] = cards
+    key, html = cards[post.pk]
+    if html is None:
+        html = card_template(context).render(
+            Context({'post': post}, autoescape=context.autoescape)
+        )
+        # карточку с заглушкой вместо миниатюры не кешируем
+        if static(settings.THUMBNAIL_PLACEHOLDER) not in html:
+            caches['fragments'].set(key, html, CARD_CACHE_TIMEOUT)
+    return mark_safe(html)
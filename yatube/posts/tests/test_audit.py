@@ -0,0 +1,69 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class QueryAuditTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост для аудита', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_hot_queries_use_composite_indexes(self):
+        """Ленты автора, группы и комментарии поста читаются по индексам."""
+        plans = {
+            'post_author_pub_date_idx':
+                Post.objects.filter(author=self.author).explain(),
+            'post_group_pub_date_idx':
+                Post.objects.filter(group=self.group).explain(),
+            'comment_post_created_idx':
+                Comment.objects.filter(post=self.post).explain(),
+            'follow_author_user_idx':
+                Follow.objects.filter(author=self.author)
+                .values('user').explain(),
+        }
+        for index, plan in plans.items():
+            with self.subTest(index=index):
+                self.assertIn(index, plan)
+
+    def test_audit_reports_every_page(self):
+        out = StringIO()
+        call_command('audit_queries', stdout=out)
+        report = out.getvalue()
+        for name in ('posts:index', 'posts:group_list', 'posts:profile',
+                     'posts:post_detail', 'posts:follow_index'):
+            with self.subTest(name=name):
+                self.assertIn(name, report)
+        self.assertIn('Запросов с полным просмотром: 0', report)
+
+    def test_template_profile_counts_includes(self):
+        out = StringIO()
+        call_command('profile_templates', repeat=1, stdout=out)
+        report = out.getvalue()
+        self.assertIn('posts:index', report)
+        self.assertRegex(report, r'includes/article\.html +1 ')
+        self.assertRegex(report, r'includes/comments\.html +1 ')
+
+    def test_template_benchmark_compares_loaders(self):
+        out = StringIO()
+        call_command('bench_templates', posts=2, repeat=1, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertIn('cached', lines[0])
+        self.assertEqual(
+            [line.split()[0] for line in lines[1:]],
+            ['bench/include.html', 'bench/inline.html', 'posts/cards.html'],
+        )
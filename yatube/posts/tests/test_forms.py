@@ -1,8 +1,10 @@
 import shutil
 import tempfile
+from unittest.mock import patch
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
@@ -88,6 +90,23 @@ class PostFormsTest(TestCase):
         ).exists()
         )
 
+    def test_edit_signals_run_in_transaction(self):
+        """Переиндексация после правки идёт в транзакции view."""
+        depth = len(connection.savepoint_ids)
+        depths = []
+        with patch(
+            'posts.signals.search.index_post',
+            side_effect=lambda post: depths.append(
+                len(connection.savepoint_ids)
+            ),
+        ):
+            self.authorized_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+                data={'text': 'Правка в транзакции'},
+            )
+        self.assertEqual(len(depths), 1)
+        self.assertGreater(depths[0], depth)
+
     def test_comment_can_authorized_user_show(self):
         comments_count = Comment.objects.count()
         form_data = {
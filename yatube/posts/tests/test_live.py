@@ -0,0 +1,145 @@
+import asyncio
+import threading
+from http import HTTPStatus
+
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from core.pubsub import Broker
+
+from .. import live
+from ..models import Comment, Follow, Group, Post, User
+
+
+class BrokerTest(TestCase):
+    def test_events_filtered_by_topic_and_id(self):
+        broker = Broker(size=3)
+        for number in range(4):
+            broker.publish(['posts', f'group:{number % 2}'], number)
+        self.assertEqual(
+            [event.data for event in broker.since(0, {'group:1'})], [1, 3]
+        )
+        self.assertEqual(
+            [event.data for event in broker.since(3, {'posts'})], [3]
+        )
+
+    def test_wait_returns_empty_after_timeout(self):
+        self.assertEqual(Broker(size=1).wait(0, {'posts'}, 0.01), [])
+
+    def test_async_waiter_woken_from_other_thread(self):
+        broker = Broker(size=10)
+
+        async def wait():
+            threading.Timer(
+                0.05, broker.publish, (['posts'], 'новый пост')
+            ).start()
+            return await broker.wait_async(0, {'posts'}, 5)
+
+        events = asyncio.run(wait())
+        self.assertEqual([event.data for event in events], ['новый пост'])
+        self.assertFalse(broker.waiters)
+
+
+class PublishTest(TransactionTestCase):
+    def test_new_posts_and_comments_published_after_commit(self):
+        user = User.objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='group')
+        last_id = live.broker.last_id
+        post = Post.objects.create(author=user, group=group, text='Пост')
+        comment = Comment.objects.create(post=post, author=user, text='Да')
+        post.save()
+        events = live.broker.since(last_id, {
+            f'author:{user.pk}', f'group:{group.pk}', f'post:{post.pk}'
+        })
+        self.assertEqual([event.data for event in events], [
+            {'type': 'post', 'id': post.pk, 'author': user.pk,
+             'group': group.pk},
+            {'type': 'comment', 'id': comment.pk, 'post': post.pk},
+        ])
+
+
+class LiveViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(author=cls.author, text='Новый пост')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_long_poll_returns_feed_events(self):
+        last_id = live.broker.last_id
+        live.publish_post(self.post)
+        response = self.client.get(reverse('posts:live_events'), {
+            'feed': 1, 'last_id': last_id, 'timeout': 0,
+        })
+        data = response.json()
+        self.assertEqual([event['id'] for event in data['events']],
+                         [self.post.pk])
+        self.assertEqual(data['last_id'], live.broker.last_id)
+        response = self.client.get(reverse('posts:live_events'), {
+            'feed': 1, 'last_id': data['last_id'], 'timeout': 0,
+        })
+        self.assertEqual(response.json()['events'], [])
+
+    def test_id_from_other_process_gets_new_events(self):
+        """id больше последнего в broker не скрывает новые события."""
+        response = self.client.get(reverse('posts:live_events'), {
+            'posts': 1, 'last_id': live.broker.last_id + 1000, 'timeout': 0,
+        })
+        last_id = response.json()['last_id']
+        self.assertEqual(last_id, live.broker.last_id)
+        live.publish_post(self.post)
+        response = self.client.get(reverse('posts:live_events'), {
+            'posts': 1, 'last_id': last_id, 'timeout': 0,
+        })
+        self.assertEqual([event['id'] for event in response.json()['events']],
+                         [self.post.pk])
+
+    def test_topics_required(self):
+        for name in ('posts:live_events', 'posts:live_stream'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_stream_sends_missed_events(self):
+        live.publish_post(self.post)
+        response = self.client.get(
+            reverse('posts:live_stream'), {'posts': 1},
+            HTTP_LAST_EVENT_ID=str(live.broker.last_id - 1),
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = iter(response.streaming_content)
+        self.assertEqual(next(chunks), b'retry: 3000\n\n')
+        self.assertIn(f'"id": {self.post.pk}'.encode(), next(chunks))
+        response.close()
+
+    def test_asgi_stream_until_disconnect(self):
+        sent = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if message['type'] == 'http.response.start':
+                live.publish_post(self.post)
+            elif b'event: post' in message.get('body', b''):
+                disconnected.set()
+
+        async def run():
+            disconnected.clear()
+            await asyncio.wait_for(live.stream({
+                'type': 'http', 'method': 'GET',
+                'path': reverse('posts:live_stream'),
+                'query_string': b'posts=1', 'headers': [],
+            }, receive, send), 5)
+
+        asyncio.run(run())
+        self.assertEqual(sent[0]['status'], HTTPStatus.OK)
+        self.assertIn(f'"id": {self.post.pk}'.encode(), sent[1]['body'])
@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post, PostTerm, User
+from ..search import matches, stem
+
+
+class StemmerTest(TestCase):
+    def test_russian_word_forms_share_stem(self):
+        """Разные формы слова приводятся к одной основе."""
+        forms = (
+            ('кошка', 'кошки', 'кошкой'),
+            ('красивая', 'красивые', 'красивого'),
+            ('подписка', 'подписки', 'подпиской'),
+        )
+        for words in forms:
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+
+
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Кошки любят кошек и рыбу'
+        )
+        cls.cat = Post.objects.create(
+            author=cls.user, text='Рыжая кошка спит на окне'
+        )
+        cls.dog = Post.objects.create(
+            author=cls.user, text='Собака охраняет дом'
+        )
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при создании и изменении поста."""
+        self.assertTrue(PostTerm.objects.filter(
+            post=self.dog, term=stem('собака')
+        ).exists())
+        self.dog.text = 'Кошка прогнала собаку'
+        self.dog.save()
+        found = [row['post'] for row in matches('кошкой')]
+        self.assertIn(self.dog.id, found)
+
+    def test_ranking_and_all_terms_required(self):
+        """Чаще встречающееся слово выше, нужны все слова запроса."""
+        found = [row['post'] for row in matches('кошку')]
+        self.assertEqual(found[:2], [self.cats.id, self.cat.id])
+        found = [row['post'] for row in matches('кошка рыба')]
+        self.assertEqual(found, [self.cats.id])
+        self.assertFalse(matches('жираф').exists())
+
+    def test_search_page(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'собаки'})
+        self.assertEqual(list(response.context['page_obj']), [self.dog])
+        self.assertTemplateUsed(response, 'posts/search.html')
+
+    def test_rebuild_command(self):
+        PostTerm.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(
+            [row['post'] for row in matches('собака')], [self.dog.id]
+        )
@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Max
+from django.test import TestCase, override_settings
+
+from ..management.commands.load_yatube import plan_sizes
+from ..models import Comment, FeedEntry, Follow, Post, PostTerm, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedAndLoadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed_yatube', users=50, groups=5, posts=300, comments=600,
+            follows=5, image_files=2, batch_size=100, stdout=StringIO(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed_builds_skewed_dataset(self):
+        """Данные созданы, подписчики и комментарии распределены неравно."""
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 600)
+        self.assertTrue(Post.objects.exclude(image=''))
+        self.assertTrue(FeedEntry.objects.exists())
+        self.assertTrue(PostTerm.objects.exists())
+        followers = list(
+            Follow.objects.values('author').annotate(total=Count('id'))
+            .order_by('-total').values_list('total', flat=True)
+        )
+        self.assertGreater(followers[0], 4 * followers[len(followers) // 2])
+        busiest = Post.objects.order_by('-comments_count').first()
+        self.assertGreater(busiest.comments_count, 600 / 300 * 10)
+
+    def test_new_post_after_seed_gets_free_id(self):
+        """После вставки с явными id последовательность постов сдвигается.
+
+        SQLite и сам не выдаёт занятые id, поэтому проверяется вызов
+        сброса последовательности, который нужен PostgreSQL.
+        """
+        with patch.object(
+            connection.ops, 'sequence_reset_sql',
+            wraps=connection.ops.sequence_reset_sql,
+        ) as sequence_reset_sql:
+            call_command(
+                'seed_yatube', users=5, groups=1, posts=10, comments=0,
+                follows=1, image_files=1, prefix='again', stdout=StringIO(),
+            )
+        models = [call[0][1] for call in sequence_reset_sql.call_args_list]
+        self.assertIn((Post,), models)
+        seeded = Post.objects.aggregate(Max('id'))['id__max']
+        post = Post.objects.create(
+            author=User.objects.first(), text='Пост после наполнения'
+        )
+        self.assertGreater(post.pk, seeded)
+
+    def test_load_reports_percentiles(self):
+        out = StringIO()
+        call_command('load_yatube', requests=40, stdout=out)
+        report = out.getvalue()
+        self.assertIn('Запросов: 40', report)
+        for name in ('index', 'post_detail', 'p95', 'всего'):
+            with self.subTest(name=name):
+                self.assertIn(name, report)
+
+    def test_load_spreads_remainder_across_workers(self):
+        self.assertEqual(plan_sizes(7, 3), [3, 2, 2])
+        self.assertEqual(plan_sizes(2, 5), [1, 1])
+        self.assertEqual(plan_sizes(6, 3), [2, 2, 2])
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Comment, FeedEntry, Follow, Group, Post, PostTerm, User
+from ..transfer import Importer, PostIdMap
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'posts.jsonl')
+        posts = [
+            Post.objects.create(
+                text=f'Кошка номер {index}', author=self.author,
+                group=self.group,
+            )
+            for index in range(5)
+        ]
+        self.old_date = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=posts[0].pk).update(pub_date=self.old_date)
+        Comment.objects.create(
+            post=posts[0], author=self.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        call_command('export_posts', self.path, stdout=StringIO())
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        Follow.objects.all().delete()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_import_restores_records_and_links(self):
+        """Загрузка восстанавливает даты, связи, ленты и индекс."""
+        call_command('import_posts', self.path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 5)
+        first = Post.objects.get(text='Кошка номер 0')
+        self.assertEqual(first.pub_date, self.old_date)
+        self.assertEqual(first.author, self.author)
+        self.assertEqual(first.group.slug, 'group')
+        self.assertEqual(first.comments.get().author, self.reader)
+        self.assertEqual(first.comments_count, 1)
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=self.author)
+        )
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 5)
+        self.assertTrue(PostTerm.objects.filter(post=first))
+        self.assertFalse(os.path.exists(self.path + '.progress'))
+
+    def test_import_resumes_after_failure(self):
+        """Повторный запуск продолжает загрузку с места остановки."""
+        with patch.object(
+            Importer, 'load_comments', side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            call_command('import_posts', self.path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertTrue(os.path.exists(self.path + '.progress'))
+        importer = Importer(self.path + '.progress')
+        with open(self.path, encoding='utf-8') as lines:
+            counts = importer.run(lines)
+        self.assertEqual(counts['post'], 0)
+        self.assertEqual(counts['comment'], 1)
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(
+            Post.objects.get(text='Кошка номер 0').comments.count(), 1
+        )
+
+    def test_batch_written_before_progress_not_duplicated(self):
+        """Пачка, записанная до сбоя, при продолжении не дублируется."""
+        # пачки по моделям: пользователи, группы, посты, комментарии
+        for batches in (3, 4):
+            with self.subTest(batches=batches):
+                Post.objects.all().delete()
+                Group.objects.all().delete()
+                save_state = Importer.save_state
+                calls = []
+
+                def crash(importer, line):
+                    calls.append(line)
+                    if len(calls) == batches:
+                        raise RuntimeError
+                    save_state(importer, line)
+
+                with patch.object(Importer, 'save_state', crash), \
+                        self.assertRaises(RuntimeError):
+                    call_command('import_posts', self.path, stdout=StringIO())
+                call_command('import_posts', self.path, stdout=StringIO())
+                self.assertEqual(Post.objects.count(), 5)
+                self.assertEqual(Comment.objects.count(), 1)
+
+
+class PostIdMapTest(TestCase):
+    def test_new_ids_follow_old_order(self):
+        ids = PostIdMap(100)
+        self.assertEqual([ids.add(old) for old in (3, 7, 20)], [101, 102, 103])
+        self.assertEqual(ids[7], 102)
+        with self.assertRaises(KeyError):
+            ids[8]
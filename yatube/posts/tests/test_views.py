@@ -1,15 +1,28 @@
 # posts/tests/test_views.py
 import shutil
 import tempfile
+from http import HTTPStatus
+from unittest.mock import patch
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.db import connection, transaction
+from django.template import Engine
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
+from core import thumbnails
+from core.cache import bump_generation, get_generations
+
+from .. import follows
+from ..constants import (COMMENTS_NUMBER, POST_THUMBNAIL_GEOMETRY,
+                         POST_THUMBNAIL_OPTIONS, POSTS_NUMBER)
+from ..models import Comment, FeedEntry, Follow, Group, Post
+from ..utils import CursorPaginator
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -56,6 +69,11 @@ class PostPagesTests(TestCase):
         self.authorized_client.force_login(self.user)
         cache.clear()
 
+    def generate_thumbnail(self):
+        thumbnails.generate(
+            self.post.image, POST_THUMBNAIL_GEOMETRY, **POST_THUMBNAIL_OPTIONS
+        )
+
     def check_post_info(self, post):
         with self.subTest(post=post):
             self.assertEqual(post.text, self.post.text)
@@ -110,6 +128,75 @@ class PostPagesTests(TestCase):
         )
         self.check_post_info(response.context['post'])
 
+    def test_detail_page_queries_do_not_grow_with_comments(self):
+        """Число запросов post_detail не зависит от числа комментариев."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        authors = [
+            User.objects.create_user(username=f'commentator_{index}')
+            for index in range(5)
+        ]
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=author, text='Комментарий')
+            for author in authors * 4
+        )
+        # первый запрос создаёт миниатюру картинки поста
+        self.client.get(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['comments']), 20)
+        with self.assertNumQueries(4):
+            self.authorized_client.get(url)
+
+    def test_detail_page_comments_cursor(self):
+        """Комментарии поста листаются курсором."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'Текст {index}')
+            for index in range(COMMENTS_NUMBER + 3)
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        first_page = self.client.get(url).context['comments']
+        self.assertEqual(len(first_page), COMMENTS_NUMBER)
+        second_page = self.client.get(
+            url + '?comments=' + first_page.next_cursor
+        ).context['comments']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(set(first_page) & set(second_page))
+
+    def test_thumbnail_placeholder_until_generated(self):
+        """Пока миниатюры нет, вместо неё отдаётся некешируемая заглушка."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, settings.THUMBNAIL_PLACEHOLDER)
+                self.assertNotIn('ETag', response)
+                self.assertIn('no-store', response['Cache-Control'])
+        self.generate_thumbnail()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertNotContains(
+                    response, settings.THUMBNAIL_PLACEHOLDER)
+                self.assertContains(response, settings.MEDIA_URL + 'cache/')
+                self.assertIn('ETag', response)
+
+    def test_thumbnail_bumps_only_its_post_once(self):
+        """Готовая миниатюра делает устаревшим только свой пост."""
+        scopes = [f'post:{self.post.pk}', 'posts']
+        before = get_generations(scopes)
+        for _ in range(2):
+            thumbnails.generate_and_publish(
+                str(self.post.image), POST_THUMBNAIL_GEOMETRY,
+                thumbnails.image_scope(self.post.image),
+                **POST_THUMBNAIL_OPTIONS
+            )
+        after = get_generations(scopes)
+        self.assertEqual(after[0], before[0] + 1)
+        self.assertEqual(after[1], before[1])
+
     def test_cache_index_page(self):
         """Проверка работы кеша"""
         post = Post.objects.create(
@@ -117,15 +204,175 @@ class PostPagesTests(TestCase):
             author=self.user)
         content_add = self.authorized_client.get(
             reverse('posts:index')).content
-        post.delete()
-        content_delete = self.authorized_client.get(
+        Post.objects.filter(pk=post.pk).update(text='Изменён без сигналов')
+        content_update = self.authorized_client.get(
             reverse('posts:index')).content
-        self.assertEqual(content_add, content_delete)
+        self.assertEqual(content_add, content_update)
         cache.clear()
         content_cache_clear = self.authorized_client.get(
             reverse('posts:index')).content
         self.assertNotEqual(content_add, content_cache_clear)
 
+    def test_cached_pages_are_per_viewer(self):
+        """Закешированная страница не попадает к другому пользователю."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'User'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.authorized_client.get(url), 'Выйти')
+                self.assertNotContains(self.client.get(url), 'Выйти')
+
+    def test_cache_invalidated_on_post_change(self):
+        """Новый и удалённый пост сразу видны на закешированных страницах."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'User'}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        post = Post.objects.create(
+            text='Свежий пост',
+            author=self.user,
+            group=self.group)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Свежий пост')
+        post.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertNotContains(response, 'Свежий пост')
+
+    def test_not_modified_pages(self):
+        """Неизменённые страницы отдаются ответом 304 без запросов к базе."""
+        self.generate_thumbnail()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'User'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertIn('Last-Modified', response)
+                with self.assertNumQueries(0):
+                    response = self.authorized_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+        etag = self.client.get(urls[0])['ETag']
+        Post.objects.create(text='Новый пост', author=self.user)
+        response = self.client.get(urls[0], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_detail_not_modified_until_comment(self):
+        self.generate_thumbnail()
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.authorized_client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий')
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_author_cards_kept_on_login(self):
+        """Вход автора не сбрасывает карточки, смена имени — сбрасывает."""
+        scope = [f'user:{self.user.pk}']
+        before = get_generations(scope)
+        self.client.force_login(self.user)
+        self.assertEqual(get_generations(scope), before)
+        self.user.first_name = 'Новое имя'
+        self.user.save(update_fields=['first_name'])
+        self.assertNotEqual(get_generations(scope), before)
+
+    def test_author_rename_shown_on_cached_index(self):
+        """Новое имя автора сразу видно на закешированной главной."""
+        self.generate_thumbnail()
+        author = User.objects.create(username='alice')
+        Post.objects.create(text='Пост Алисы', author=author)
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertContains(response, 'alice')
+        author.username = 'bobby'
+        author.save()
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            .status_code,
+            200,
+        )
+        response = self.client.get(url)
+        self.assertContains(response, 'bobby')
+        self.assertNotContains(response, 'alice')
+
+    def test_post_detail_etag_follows_author_not_subscriptions(self):
+        """ETag поста меняет переименование автора, а не чужие подписки."""
+        self.generate_thumbnail()
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.client.get(url)['ETag']
+        Follow.objects.create(
+            user=User.objects.create(username='follower'), author=self.user)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.user.first_name = 'Переименован'
+        self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Переименован')
+
+    def test_card_template_loaded_once_with_cached_loader(self):
+        """С кеширующим загрузчиком шаблон карточки ищется один раз."""
+        templates = [{
+            **settings.TEMPLATES[0],
+            'APP_DIRS': False,
+            'OPTIONS': {
+                **settings.TEMPLATES[0]['OPTIONS'],
+                'loaders': [('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ])],
+            },
+        }]
+        with override_settings(TEMPLATES=templates), patch.object(
+            Engine, 'get_template', autospec=True,
+            side_effect=Engine.get_template,
+        ) as get_template:
+            for _ in range(2):
+                cache.clear()
+                self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            [call[0][1] for call in get_template.call_args_list].count(
+                'includes/article.html'),
+            1,
+        )
+
+    def test_post_card_invalidated_only_for_edited_post(self):
+        """Карточка поста кешируется, правка сбрасывает только её."""
+        edited, other = (
+            Post.objects.create(text=f'Карточка {index}', author=self.user)
+            for index in range(2)
+        )
+        self.authorized_client.get(reverse('posts:index'))
+        Post.objects.filter(pk__in=(edited.pk, other.pk)).update(
+            text='Изменён без сигналов')
+        bump_generation('posts')
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': 'User'}))
+        self.assertContains(response, 'Карточка 0')
+        self.assertNotContains(response, 'Изменён без сигналов')
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': edited.pk}),
+            data={'text': 'Отредактированный пост'},
+        )
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Отредактированный пост')
+        self.assertContains(response, 'Карточка 1')
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -171,6 +418,116 @@ class PaginatorViewsTest(TestCase):
                 response = self.guest_client.get(reverse_name)
                 self.assertEqual(len(response.context['page_obj']), 3)
 
+    def test_cursor_pages_walk_all_records(self):
+        """Keyset-пагинация проходит все записи без повторов."""
+        url = reverse('posts:index')
+        response = self.guest_client.get(url + '?cursor=')
+        first_page = response.context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+        response = self.guest_client.get(
+            url + '?cursor=' + first_page.next_cursor
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        ids = [post.id for post in first_page] + [
+            post.id for post in second_page
+        ]
+        self.assertEqual(
+            ids, list(Post.objects.order_by('-pub_date', '-id')
+                      .values_list('id', flat=True))
+        )
+        response = self.guest_client.get(
+            url + '?cursor=' + second_page.previous_cursor
+        )
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']], ids[:10]
+        )
+
+    def test_cursor_page_does_not_count(self):
+        """Keyset-страница не выполняет COUNT(*)."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        with self.assertNumQueries(1):
+            page = paginator.get_page(None)
+            list(page)
+        with self.assertNumQueries(1):
+            list(paginator.get_page(page.next_cursor))
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый токен курсора отдаёт первую страницу."""
+        response = self.guest_client.get(
+            reverse('posts:index') + '?cursor=broken'
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_partial_page_without_layout(self):
+        """?partial=1 отдаёт только карточки и ссылку на следующие."""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'User'}),
+        ):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, {'partial': 1})
+                self.assertTemplateUsed(response, 'posts/cards.html')
+                self.assertTemplateNotUsed(response, 'base.html')
+                self.assertEqual(len(response.context['page_obj']), 10)
+                self.assertEqual(
+                    response['Link'], '<?partial=1&page=2>; rel="next"'
+                )
+                response = self.guest_client.get(url + '?partial=1&page=2')
+                self.assertEqual(len(response.context['page_obj']), 3)
+                self.assertNotIn('Link', response)
+
+    def test_page_and_fragment_render_same_cards(self):
+        """Карточки страницы и фрагмента ?partial=1 совпадают."""
+        self.addCleanup(cache.clear)
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'User'}),
+        ):
+            with self.subTest(url=url):
+                cache.clear()
+                page = self.guest_client.get(url).content.decode()
+                fragment = self.guest_client.get(
+                    url, {'partial': 1}
+                ).content.decode()
+                cards = [card.strip() for card in fragment.split('<hr>')]
+                self.assertEqual(len(cards), 11)
+                for card in cards[:-1]:
+                    self.assertIn(card, page)
+
+    def test_since_returns_only_newer_cards(self):
+        """?since= отдаёт карточки постов новее первого на странице."""
+        cache.clear()
+        url = reverse('posts:group_list', kwargs={'slug': 'test_slug'})
+        since = self.guest_client.get(url).context['since']
+        self.assertEqual(self.guest_client.get(
+            url, {'since': since}
+        ).context['page_obj'].object_list, [])
+        new_posts = [
+            Post.objects.create(
+                text=f'Новый пост {number}', author=self.user,
+                group=self.group,
+            )
+            for number in range(2)
+        ]
+        response = self.guest_client.get(url, {'since': since})
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            list(response.context['page_obj']), new_posts[::-1]
+        )
+        response = self.guest_client.get(
+            url, {'since': response['X-Since']}
+        )
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertEqual(
+            self.guest_client.get(url, {'since': 'broken'}).status_code,
+            HTTPStatus.BAD_REQUEST,
+        )
+
 
 class FollowViewsTest(TestCase):
     @classmethod
@@ -218,6 +575,48 @@ class FollowViewsTest(TestCase):
                 kwargs={'username': self.post_follower}))
         self.assertEqual(Follow.objects.count(), count_follow - 1)
 
+    def test_repeated_follow_is_idempotent(self):
+        """Повторная подписка не создаёт записей и не меняет счётчики."""
+        url = reverse(
+            'posts:profile_follow', kwargs={'username': self.post_follower})
+        for _ in range(2):
+            self.follower_client.post(url)
+        self.assertEqual(Follow.objects.filter(
+            user=self.post_autor, author=self.post_follower).count(), 1)
+        self.post_follower.stats.refresh_from_db()
+        self.assertEqual(self.post_follower.stats.followers_count, 1)
+        self.follower_client.post(reverse(
+            'posts:profile_follow', kwargs={'username': self.post_autor}))
+        self.assertFalse(Follow.objects.filter(author=self.post_autor))
+
+    def test_profile_following_is_per_viewer(self):
+        """Кнопка подписки зависит от того, кто смотрит профиль."""
+        Follow.objects.create(
+            user=self.post_autor,
+            author=self.post_follower)
+        url = reverse(
+            'posts:profile', kwargs={'username': self.post_follower})
+        self.assertTrue(
+            self.follower_client.get(url).context['following'])
+        viewer = Client()
+        viewer.force_login(User.objects.create(username='viewer'))
+        self.assertFalse(viewer.get(url).context['following'])
+
+    def test_follow_state_for_page_from_cache(self):
+        """Подписки на авторов страницы проверяются без запросов к базе."""
+        Follow.objects.create(
+            user=self.post_autor,
+            author=self.post_follower)
+        authors = [self.post_follower.pk, self.post_autor.pk]
+        self.assertEqual(
+            follows.following_among(self.post_autor, authors),
+            {self.post_follower.pk})
+        with self.assertNumQueries(0):
+            follows.following_among(self.post_autor, authors)
+        follows.unfollow(self.post_autor, self.post_follower)
+        self.assertFalse(
+            follows.following_among(self.post_autor, authors))
+
     def test_follow_on_authors(self):
         """Проверка записей у тех кто подписан."""
         post = Post.objects.create(
@@ -238,3 +637,87 @@ class FollowViewsTest(TestCase):
         response = self.author_client.get(
             reverse('posts:follow_index'))
         self.assertNotIn(post, response.context['page_obj'].object_list)
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленту подписчика, отписка его убирает."""
+        Follow.objects.create(
+            user=self.post_follower,
+            author=self.post_autor)
+        post = Post.objects.create(
+            author=self.post_autor,
+            text='Пост для ленты')
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.post_follower, post=post).exists())
+        Follow.objects.filter(
+            user=self.post_follower, author=self.post_autor).delete()
+        self.assertFalse(FeedEntry.objects.filter(
+            user=self.post_follower).exists())
+
+    @patch('posts.feed.FEED_FANOUT_LIMIT', 1)
+    def test_popular_author_read_without_fan_out(self):
+        """Посты популярного автора читаются без раздачи по лентам."""
+        Follow.objects.create(
+            user=self.post_follower,
+            author=self.post_autor)
+        cache.clear()
+        post = Post.objects.create(
+            author=self.post_autor,
+            text='Пост популярного автора')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        response = self.author_client.get(
+            reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'].object_list)
+
+    def test_formerly_popular_author_posts_stay_in_feed(self):
+        """Посты, написанные без раздачи, не пропадают из ленты."""
+        Follow.objects.create(
+            user=self.post_follower,
+            author=self.post_autor)
+        with patch('posts.feed.FEED_FANOUT_LIMIT', 1):
+            cache.clear()
+            post = Post.objects.create(
+                author=self.post_autor,
+                text='Пост популярного автора')
+        cache.clear()
+        response = self.author_client.get(
+            reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'].object_list)
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_feed_pages_read_from_feed_entries(self):
+        """Лента листается по индексу FeedEntry, без сортировки постов."""
+        Follow.objects.create(
+            user=self.post_follower,
+            author=self.post_autor)
+        for number in range(POSTS_NUMBER + 3):
+            Post.objects.create(author=self.post_autor, text=f'Пост {number}')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.author_client.get(
+                reverse('posts:follow_index'))
+        page_obj = response.context['page_obj']
+        self.assertTrue(any(
+            'FROM "posts_feedentry"' in query['sql']
+            and 'ORDER BY "posts_feedentry"."pub_date" DESC' in query['sql']
+            for query in queries
+        ))
+        response = self.author_client.get(
+            reverse('posts:follow_index'),
+            {'cursor': page_obj.next_cursor})
+        shown = list(page_obj) + list(response.context['page_obj'])
+        self.assertTrue(all(isinstance(post, Post) for post in shown))
+        self.assertEqual(
+            [post.pk for post in shown],
+            list(Post.objects.filter(author=self.post_autor)
+                 .order_by('-pub_date', '-id').values_list('pk', flat=True)))
+
+
+class FollowCacheTest(TransactionTestCase):
+    def test_follows_forgotten_again_after_commit(self):
+        """Подписки, закешированные до фиксации, сбрасываются после неё."""
+        cache.clear()
+        user = User.objects.create(username='reader')
+        author = User.objects.create(username='author')
+        with transaction.atomic():
+            follows.follow(user, author)
+            cache.set(follows.FOLLOWS_KEY.format(user.pk), frozenset())
+        self.assertTrue(follows.is_following(user, author))
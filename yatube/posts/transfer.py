@@ -0,0 +1,304 @@
+"""Потоковые выгрузка и загрузка постов в формате JSONL.
+
+Каждая строка файла — одна запись {"model": "post", "id": 1, ...}.
+Записи идут по моделям в порядке EXPORT_FIELDS, а внутри модели по
+возрастанию id, поэтому при загрузке ссылки ведут на уже загруженные
+записи и разрешаются через карты старых id в новые. Пользователи и
+группы сопоставляются по username и slug, а посты и комментарии
+получают id подряд после max(id), так что карта постов — отсортированный
+массив старых id.
+
+Загрузка пишет пачками bulk_create, каждую пачку в своей транзакции,
+и после неё сохраняет номер последней строки в файл прогресса.
+Повторный запуск пропускает уже записанные строки. Пачка, которая
+успела записаться, но не попала в файл прогресса, не дублируется:
+пользователи, группы и подписки пишутся с ignore_conflicts, а посты
+и комментарии с уже занятыми id пропускаются.
+"""
+import json
+import os
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+from itertools import groupby, islice
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from core.cache import bump_generation
+
+from . import feed, search
+from .constants import TRANSFER_BATCH_SIZE
+from .counters import rebuild_counters
+from .models import Comment, Follow, Group, Post, User
+
+EXPORT_FIELDS = {
+    'user': (User, (
+        'id', 'username', 'password', 'first_name', 'last_name', 'email',
+        'date_joined',
+    )),
+    'group': (Group, ('id', 'title', 'slug', 'description')),
+    'post': (Post, ('id', 'text', 'pub_date', 'author', 'group', 'image')),
+    'comment': (Comment, ('id', 'post', 'author', 'text', 'created')),
+    'follow': (Follow, ('id', 'user', 'author')),
+}
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def copy_file(source, target, name):
+    """Копирует файл между хранилищами, если его там ещё нет."""
+    if target.exists(name):
+        if target.size(name) == source.size(name):
+            return False
+        target.delete(name)
+    with source.open(name) as file:
+        target.save(name, file)
+    return True
+
+
+def copy_media(names, source, target, workers):
+    """Копирует файлы в несколько потоков по одной пачке за раз."""
+    copied = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunks(names, TRANSFER_BATCH_SIZE):
+            copied += sum(pool.map(partial(copy_file, source, target), chunk))
+    return copied
+
+
+def post_images():
+    return Post.objects.exclude(image='').order_by('id').values_list(
+        'image', flat=True
+    ).iterator(chunk_size=TRANSFER_BATCH_SIZE)
+
+
+def export_posts(stream):
+    """Пишет все записи в stream, возвращает их количество."""
+    total = 0
+    for model_name, (model, fields) in EXPORT_FIELDS.items():
+        rows = model.objects.order_by('id').values(*fields)
+        for row in rows.iterator(chunk_size=TRANSFER_BATCH_SIZE):
+            stream.write(json.dumps(
+                {'model': model_name, **row},
+                default=datetime.isoformat,
+                ensure_ascii=False,
+            ))
+            stream.write('\n')
+            total += 1
+    return total
+
+
+class PostIdMap:
+    """Новые id постов идут подряд с base + 1 в порядке старых id."""
+
+    def __init__(self, base):
+        self.base = base
+        self.old_ids = array('q')
+
+    def add(self, old_id):
+        self.old_ids.append(old_id)
+        return self.base + len(self.old_ids)
+
+    def __getitem__(self, old_id):
+        index = bisect_left(self.old_ids, old_id)
+        if index == len(self.old_ids) or self.old_ids[index] != old_id:
+            raise KeyError(old_id)
+        return self.base + index + 1
+
+
+def reset_sequences(*models):
+    """Сдвигает последовательности id за max(id) после вставки с явными id."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def missing(model, objects):
+    """Объекты с заранее выбранными id, которых ещё нет в базе."""
+    existing = set(model.objects.filter(
+        pk__in=[obj.pk for obj in objects]
+    ).values_list('pk', flat=True))
+    return [obj for obj in objects if obj.pk not in existing]
+
+
+@contextmanager
+def original_dates():
+    """Отключает auto_now_add, чтобы bulk_create сохранил даты из файла."""
+    fields = (
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    )
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Загрузка JSONL с продолжением с места остановки.
+
+    Рассчитана на то, что во время загрузки посты и комментарии больше
+    никто не создаёт: их id выделяются подряд после max(id).
+    """
+
+    def __init__(self, progress_path, batch_size=TRANSFER_BATCH_SIZE,
+                 media=None, workers=4):
+        self.progress_path = progress_path
+        self.batch_size = batch_size
+        self.copy_media = media and partial(
+            copy_media, source=media, target=Post.image.field.storage,
+            workers=workers,
+        )
+        self.state = self.load_state()
+        self.users = {}
+        self.groups = {}
+        self.posts = PostIdMap(self.state['post_base'])
+        self.comments = 0
+        self.counts = dict.fromkeys(EXPORT_FIELDS, 0)
+
+    def load_state(self):
+        if os.path.exists(self.progress_path):
+            with open(self.progress_path) as file:
+                return json.load(file)
+        return {
+            'line': 0,
+            'post_base': Post.objects.aggregate(Max('id'))['id__max'] or 0,
+            'comment_base': (
+                Comment.objects.aggregate(Max('id'))['id__max'] or 0
+            ),
+        }
+
+    def save_state(self, line):
+        self.state['line'] = line
+        temp_path = self.progress_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.state, file)
+        os.replace(temp_path, self.progress_path)
+
+    def run(self, lines):
+        """Загружает строки файла, возвращает число записей по моделям."""
+        records = (
+            (number, json.loads(line))
+            for number, line in enumerate(lines, 1)
+            if line.strip()
+        )
+        with original_dates():
+            for model_name, group in groupby(
+                records, key=lambda record: record[1]['model']
+            ):
+                load = getattr(self, f'load_{model_name}s')
+                for batch in chunks(group, self.batch_size):
+                    skip = sum(
+                        number <= self.state['line'] for number, _ in batch
+                    )
+                    rows = [row for _, row in batch]
+                    with transaction.atomic():
+                        load(rows, skip)
+                    if skip < len(rows):
+                        self.counts[model_name] += len(rows) - skip
+                        self.save_state(batch[-1][0])
+        self.finish()
+        return self.counts
+
+    def load_users(self, rows, skip):
+        fields = EXPORT_FIELDS['user'][1][1:]
+        User.objects.bulk_create(
+            [
+                User(**{field: row[field] for field in fields})
+                for row in rows[skip:]
+            ],
+            ignore_conflicts=True,
+        )
+        ids = dict(User.objects.filter(
+            username__in=[row['username'] for row in rows]
+        ).values_list('username', 'id'))
+        for row in rows:
+            self.users[row['id']] = ids[row['username']]
+
+    def load_groups(self, rows, skip):
+        fields = EXPORT_FIELDS['group'][1][1:]
+        Group.objects.bulk_create(
+            [
+                Group(**{field: row[field] for field in fields})
+                for row in rows[skip:]
+            ],
+            ignore_conflicts=True,
+        )
+        ids = dict(Group.objects.filter(
+            slug__in=[row['slug'] for row in rows]
+        ).values_list('slug', 'id'))
+        for row in rows:
+            self.groups[row['id']] = ids[row['slug']]
+
+    def load_posts(self, rows, skip):
+        new_ids = [self.posts.add(row['id']) for row in rows]
+        posts = [
+            Post(
+                id=new_id,
+                text=row['text'],
+                pub_date=parse_datetime(row['pub_date']),
+                author_id=self.users[row['author']],
+                group_id=self.groups.get(row['group']),
+                image=row['image'],
+            )
+            for new_id, row in zip(new_ids[skip:], rows[skip:])
+        ]
+        posts = missing(Post, posts)
+        Post.objects.bulk_create(posts)
+        search.index_posts((post.id, post.text) for post in posts)
+        feed.fan_out_posts(posts)
+        if self.copy_media:
+            self.copy_media(post.image.name for post in posts if post.image)
+
+    def load_comments(self, rows, skip):
+        base = self.state['comment_base'] + self.comments
+        self.comments += len(rows)
+        comments = [
+            Comment(
+                id=base + index + 1,
+                post_id=self.posts[row['post']],
+                author_id=self.users[row['author']],
+                text=row['text'],
+                created=parse_datetime(row['created']),
+            )
+            for index, row in enumerate(rows)
+        ][skip:]
+        Comment.objects.bulk_create(missing(Comment, comments))
+
+    def load_follows(self, rows, skip):
+        follows = [
+            (self.users[row['user']], self.users[row['author']])
+            for row in rows[skip:]
+        ]
+        Follow.objects.bulk_create(
+            (
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in follows
+            ),
+            ignore_conflicts=True,
+        )
+        for user_id, author_id in follows:
+            feed.add_author_to_feed(user_id, author_id)
+
+    def finish(self):
+        """Счётчики, последовательности id и кеш после загрузки."""
+        reset_sequences(Post, Comment)
+        rebuild_counters()
+        bump_generation('posts')
+        if os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
@@ -1,9 +1,210 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import hashlib
+import json
+from functools import reduce
+from operator import or_
 
-from .constants import POSTS_NUMBER
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 
+from .constants import (COMMENTS_CURSOR_PARAM, COMMENTS_NUMBER,
+                        COMMENTS_ORDERING, COUNT_CACHE_TIMEOUT,
+                        CURSOR_ORDERING, CURSOR_PARAM, POSTS_NUMBER)
 
-def paginate_page(request, post_list):
-    paginator = Paginator(post_list, POSTS_NUMBER)
+
+class ApproximateCountPaginator(Paginator):
+    """Paginator, который берёт количество объектов из кеша.
+
+    COUNT(*) по большой таблице выполняется не чаще раза
+    в COUNT_CACHE_TIMEOUT секунд для каждого запроса.
+    """
+
+    @cached_property
+    def count(self):
+        query = str(self.object_list.query).encode()
+        key = 'paginator_count:' + hashlib.md5(query).hexdigest()
+        return cache.get_or_set(
+            key, self.object_list.count, COUNT_CACHE_TIMEOUT
+        )
+
+
+class CursorPage(Page):
+    """Страница keyset-пагинации с токенами соседних страниц."""
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+
+class CursorPaginator(ApproximateCountPaginator):
+    """Keyset-пагинация по полям ordering (по умолчанию pub_date, id).
+
+    Вместо OFFSET следующая страница выбирается условием
+    «строго после последней записи текущей страницы», поэтому
+    страница N стоит столько же, сколько первая. COUNT(*) не нужен:
+    наличие следующей страницы определяется лишней (per_page + 1)
+    записью выборки.
+    """
+
+    def __init__(self, object_list, per_page, ordering=CURSOR_ORDERING):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+
+    def encode_cursor(self, obj, direction):
+        if isinstance(obj, dict):
+            values = [obj[name] for name in self.fields]
+        else:
+            values = [getattr(obj, name) for name in self.fields]
+        data = json.dumps(
+            [direction, values], default=lambda value: value.isoformat()
+        )
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Возвращает (direction, values) или None для битого токена."""
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            data = base64.urlsafe_b64decode(cursor + padding)
+            direction, values = json.loads(data.decode())
+            if direction not in ('next', 'prev'):
+                return None
+            if len(values) != len(self.fields):
+                return None
+            opts = self.object_list.model._meta
+            return direction, [
+                opts.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (binascii.Error, ValueError, TypeError, LookupError,
+                ValidationError):
+            return None
+
+    def _seek_filter(self, values, reverse):
+        """Условие «строго после values» в порядке ordering.
+
+        Для ordering (-a, -b) это (a < x) OR (a = x AND b < y).
+        """
+        conditions = []
+        for index, name in enumerate(self.ordering):
+            descending = name.startswith('-') != reverse
+            lookup = '{}__{}'.format(
+                self.fields[index], 'lt' if descending else 'gt'
+            )
+            equal = dict(zip(self.fields[:index], values[:index]))
+            conditions.append(Q(**equal) & Q(**{lookup: values[index]}))
+        return reduce(or_, conditions)
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else '-' + name
+            for name in self.ordering
+        ]
+
+    def cursor_page(self, cursor=None):
+        return self._page(self.decode_cursor(cursor) if cursor else None)
+
+    def newer_page(self, cursor):
+        """Страница записей перед курсором (в ленте — новее него).
+
+        Берутся ближайшие к курсору записи, поэтому после большого
+        разрыва клиент догоняет ленту несколькими запросами.
+        None, если курсор битый.
+        """
+        decoded = self.decode_cursor(cursor)
+        if decoded is None:
+            return None
+        return self._page(('prev', decoded[1]))
+
+    def _page(self, decoded):
+        queryset = self.object_list
+        backwards = decoded is not None and decoded[0] == 'prev'
+        if decoded is None:
+            queryset = queryset.order_by(*self.ordering)
+        elif backwards:
+            queryset = queryset.filter(
+                self._seek_filter(decoded[1], reverse=True)
+            ).order_by(*self._reversed_ordering())
+        else:
+            queryset = queryset.filter(
+                self._seek_filter(decoded[1], reverse=False)
+            ).order_by(*self.ordering)
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows, self)
+        has_next = has_more if not backwards else True
+        has_previous = decoded is not None if not backwards else has_more
+        return CursorPage(
+            rows,
+            self,
+            next_cursor=(
+                self.encode_cursor(rows[-1], 'next') if has_next else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(rows[0], 'prev') if has_previous else None
+            ),
+        )
+
+    def get_page(self, cursor):
+        return self.cursor_page(cursor)
+
+
+def paginate_page(request, post_list, ordering=CURSOR_ORDERING):
+    """Страница списка постов.
+
+    Keyset-режим включается параметром ?cursor= или настройкой
+    POSTS_PAGINATION = 'cursor'; иначе обычная нумерация страниц,
+    при POSTS_APPROXIMATE_COUNT количество берётся из кеша.
+    """
+    cursor = request.GET.get(CURSOR_PARAM)
+    if cursor is not None or settings.POSTS_PAGINATION == 'cursor':
+        paginator = CursorPaginator(post_list, POSTS_NUMBER, ordering)
+        return paginator.get_page(cursor)
+    if settings.POSTS_APPROXIMATE_COUNT:
+        paginator = ApproximateCountPaginator(post_list, POSTS_NUMBER)
+    else:
+        paginator = Paginator(post_list, POSTS_NUMBER)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def newest_cursor(posts, ordering=CURSOR_ORDERING):
+    """Курсор самого нового из posts для запроса ?since= или None."""
+    if not posts:
+        return None
+    paginator = CursorPaginator(None, POSTS_NUMBER, ordering)
+    return paginator.encode_cursor(posts[0], 'prev')
+
+
+def paginate_comments(request, comments):
+    """Страница комментариев поста, всегда в keyset-режиме."""
+    paginator = CursorPaginator(
+        comments, COMMENTS_NUMBER, COMMENTS_ORDERING
+    )
+    return paginator.get_page(request.GET.get(COMMENTS_CURSOR_PARAM))
@@ -1,61 +1,168 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import (HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
 
+from core.cache import cache_page_by_generation, condition_by_generation
+
+from . import follows, live
+from . import search as post_search
+from .constants import (CURSOR_ORDERING, CURSOR_PARAM, LIVE_POLL_TIMEOUT,
+                        PAGE_CACHE_TIMEOUT, PARTIAL_PARAM,
+                        POST_AUTHOR_CACHE_TIMEOUT, POSTS_NUMBER, SINCE_PARAM)
+from .feed import entry_posts, feed_posts
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import paginate_page
+from .models import Group, Post, User
+from .utils import (CursorPaginator, newest_cursor, paginate_comments,
+                    paginate_page)
 
 User = get_user_model()
 
 
-@cache_page(20, key_prefix='index_page')
+def render_posts(request, template_name, posts, context=None,
+                 ordering=CURSOR_ORDERING):
+    """Лента постов целой страницей или только карточками.
+
+    ?since=<курсор> — карточки постов новее курсора, ?partial=1 —
+    карточки текущей страницы без шаблона сайта. Курсор для
+    следующего ?since= передаётся в заголовке X-Since (и в since
+    контекста страницы), следующая страница карточек — в Link.
+    posts может быть и записями ленты FeedEntry в порядке ordering.
+    """
+    since = request.GET.get(SINCE_PARAM)
+    if since is not None:
+        page_obj = CursorPaginator(
+            posts, POSTS_NUMBER, ordering
+        ).newer_page(since)
+        if page_obj is None:
+            return HttpResponseBadRequest('Неверный курсор')
+        newest = newest_cursor(page_obj, ordering)
+        page_obj.object_list = entry_posts(page_obj)
+        response = render(request, 'posts/cards.html', {
+            'page_obj': page_obj, 'fragment': True,
+        })
+        response['X-Since'] = newest or since
+        return response
+    page_obj = paginate_page(request, posts, ordering)
+    newest = newest_cursor(page_obj, ordering)
+    page_obj.object_list = entry_posts(page_obj)
+    if request.GET.get(PARTIAL_PARAM):
+        response = render(request, 'posts/cards.html', {
+            'page_obj': page_obj, 'fragment': True,
+        })
+        if page_obj.has_next():
+            response['Link'] = '<?{}>; rel="next"'.format(urlencode({
+                PARTIAL_PARAM: 1,
+                **({CURSOR_PARAM: page_obj.next_cursor}
+                   if page_obj.number is None
+                   else {'page': page_obj.next_page_number()}),
+            }))
+        response['X-Since'] = newest or ''
+        return response
+    return render(request, template_name, {
+        **(context or {}),
+        'page_obj': page_obj,
+        'since': newest,
+    })
+
+
+@condition_by_generation('posts')
+@cache_page_by_generation(PAGE_CACHE_TIMEOUT, 'posts')
 def index(request):
     """Главная страница"""
     last_posts = Post.objects.select_related('group', 'author')
-    page_obj = paginate_page(request, last_posts)
-    return render(request, 'posts/index.html', {'page_obj': page_obj})
+    return render_posts(request, 'posts/index.html', last_posts)
 
 
+@condition_by_generation('posts')
+@cache_page_by_generation(PAGE_CACHE_TIMEOUT, 'posts')
 def group_posts(request, slug):
     """Страница постов выбранной группы"""
     group = get_object_or_404(Group, slug=slug)
     posts = group.posts.select_related('group', 'author').all()
-    page_obj = paginate_page(request, posts)
-    return render(
-        request,
-        'posts/group_list.html',
-        {'group': group, 'page_obj': page_obj}
+    return render_posts(
+        request, 'posts/group_list.html', posts, {'group': group}
     )
 
 
+@condition_by_generation('posts', 'profile:{username}')
+@cache_page_by_generation(PAGE_CACHE_TIMEOUT, 'posts', 'profile:{username}')
 def profile(request, username):
     """Страница постов выбранного автора"""
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     posts = author.posts.select_related('group', 'author').all()
-    page_obj = paginate_page(request, posts)
-    following = request.user.is_authenticated and author.following.exists()
+    following = follows.is_following(request.user, author)
     context = {
-        'page_obj': page_obj,
         'author': author,
         'following': following
     }
-    return render(request, 'posts/profile.html', context)
+    return render_posts(request, 'posts/profile.html', posts, context)
+
+
+def detail_posts():
+    return Post.objects.select_related('author__stats', 'group')
+
+
+def post_author_scope(request, post_id):
+    """Область автора поста: его имя выводится на странице поста.
+
+    Автор у поста не меняется, поэтому его id берётся из кеша,
+    и ответ 304 обходится без запросов к базе. Если id в кеше нет,
+    пост загружается здесь же и передаётся во view.
+    """
+    key = f'post_author:{post_id}'
+    author_id = cache.get(key)
+    if author_id is None:
+        request.detail_post = detail_posts().filter(pk=post_id).first()
+        if request.detail_post is not None:
+            author_id = request.detail_post.author_id
+            cache.set(key, author_id, POST_AUTHOR_CACHE_TIMEOUT)
+    return f'user:{author_id}'
 
 
+@condition_by_generation(
+    'posts', 'post:{post_id}', 'comments:{post_id}', post_author_scope
+)
 def post_detail(request, post_id):
     """Страница выбранного поста"""
-    post = get_object_or_404(Post, pk=post_id)
+    post = getattr(request, 'detail_post', None) or get_object_or_404(
+        detail_posts(), pk=post_id
+    )
+    comments = paginate_comments(
+        request, post.comments.select_related('author')
+    )
     form = CommentForm(request.POST)
     context = {
         'post': post,
         'form': form,
+        'comments': comments,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    """Поиск постов по тексту"""
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(post_search.matches(query), POSTS_NUMBER)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.object_list = post_search.posts_for_matches(page_obj)
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'query_param': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     """Создание нового поста, после успешного заполнения -
     переход на страницу профиля"""
@@ -71,6 +178,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     """Редактирование поста - доступно только автору поста,
     если пользователь - не автор - переход на страницу поста.
@@ -98,6 +206,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     """Создание комментария к посту"""
     post = get_object_or_404(Post, pk=post_id)
@@ -113,27 +222,59 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     """Страница постов авторов, на которых подписан текущий пользователь."""
-    user = get_object_or_404(User, username=request.user)
-    posts_list = Post.objects.filter(
-        author__following__user=user).select_related('group', 'author')
-    page_obj = paginate_page(request, posts_list)
-    return render(request, 'posts/follow.html', {'page_obj': page_obj})
+    posts, ordering = feed_posts(request.user)
+    return render_posts(
+        request, 'posts/follow.html', posts, ordering=ordering
+    )
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     """Подписаться на автора"""
     author = get_object_or_404(User, username=username)
-    if request.user != author and not author.following.exists():
-        Follow.objects.create(user=request.user, author=author)
+    if request.user != author:
+        follows.follow(request.user, author)
     return redirect('posts:profile', username=username)
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     """Дизлайк, отписка"""
     author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(user=request.user, author=author)
-    if follow.exists():
-        follow.delete()
+    follows.unfollow(request.user, author)
     return redirect('posts:profile', username=username)
+
+
+def live_events(request):
+    """Long-poll: новые события по темам или пустой список по таймауту."""
+    topics = live.topics_for(request.GET, request.user)
+    if not topics:
+        return JsonResponse({'detail': 'Не указаны темы'}, status=400)
+    last_id = live.last_event_id(request.GET.get('last_id'))
+    try:
+        timeout = min(float(request.GET['timeout']), LIVE_POLL_TIMEOUT)
+    except (KeyError, ValueError):
+        timeout = LIVE_POLL_TIMEOUT
+    events = live.broker.wait(last_id, topics, timeout)
+    return JsonResponse({
+        'events': [live.event_dict(event) for event in events],
+        'last_id': events[-1].id if events else last_id,
+    })
+
+
+def live_stream(request):
+    """Поток SSE с теми же темами, что у live_events."""
+    topics = live.topics_for(request.GET, request.user)
+    if not topics:
+        return JsonResponse({'detail': 'Не указаны темы'}, status=400)
+    response = StreamingHttpResponse(live.sse_stream(
+        live.last_event_id(request.META.get(
+            'HTTP_LAST_EVENT_ID', request.GET.get('last_id')
+        )),
+        topics,
+    ))
+    for name, value in live.SSE_HEADERS:
+        response[name] = value
+    return response
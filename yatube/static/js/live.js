@@ -0,0 +1,46 @@
+// Новые посты на первой странице ленты: о них сообщает поток SSE,
+// а карточки новее data-since страница запрашивает у себя же
+// (?since=), без перерисовки всей страницы.
+(function () {
+  var script = document.currentScript;
+  var list = document.querySelector('[data-live]');
+  if (!list || !window.EventSource || window.location.search) {
+    return;
+  }
+  var loading = false;
+  var pending = false;
+
+  function load() {
+    if (loading) {
+      pending = true;
+      return;
+    }
+    loading = true;
+    fetch(window.location.pathname + '?since=' + list.dataset.since)
+      .then(function (response) {
+        list.dataset.since = response.headers.get('X-Since');
+        return response.text();
+      })
+      .then(function (html) {
+        list.insertAdjacentHTML('afterbegin', html);
+      })
+      .finally(function () {
+        loading = false;
+        if (pending) {
+          pending = false;
+          load();
+        }
+      });
+  }
+
+  var source = new EventSource(
+    script.dataset.stream + '?' + list.dataset.live
+  );
+  source.addEventListener('post', function () {
+    if (list.dataset.since) {
+      load();
+    } else {
+      window.location.reload();
+    }
+  });
+})();
@@ -0,0 +1,25 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``, e.g. ``uvicorn yatube.asgi:application``.
+Requests are handled by the WSGI handler in a thread pool, see core.asgi;
+the live event stream is served natively without holding a thread.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+wsgi_application = get_wsgi_application()
+
+from django.urls import reverse  # noqa: E402
+
+from core.asgi import WsgiToAsgi  # noqa: E402
+from posts import live  # noqa: E402
+
+application = WsgiToAsgi(
+    wsgi_application, routes={reverse('posts:live_stream'): live.stream}
+)
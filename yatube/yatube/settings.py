@@ -29,6 +29,7 @@ INSTALLED_APPS = [
     'about.apps.AboutConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -38,6 +39,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,7 +56,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -68,17 +72,58 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# Потоки, в которых yatube.asgi выполняет запросы: столько запросов
+# одновременно работает в Django, ожидающие соединения потоков не держат.
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 16))
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Параметры базы берутся из окружения; по умолчанию — SQLite рядом
+# с проектом. CONN_MAX_AGE=0 открывает соединение на каждый запрос.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.environ.get('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'USER': os.environ.get('DB_USER', ''),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', ''),
+        'PORT': os.environ.get('DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
     }
 }
+# PRAGMA для каждого нового соединения с SQLite (core.db.configure_sqlite)
+SQLITE_PRAGMAS = {}
+
+# Реплики только для чтения — копии основной базы, которые держит
+# в актуальном состоянии сама СУБД (потоковая репликация PostgreSQL).
+# DB_REPLICAS — их адреса через запятую (host или host:port), остальные
+# параметры берутся из основной базы. Для SQLite это пути к файлам:
+# синхронизации у них нет, так реплики подключаются только в тестах.
+# Тесты запускаются без DB_REPLICAS: тестовые классы работают только
+# с default, а MIRROR не даёт создавать для реплик отдельные базы.
+DATABASE_REPLICAS = []
+for index, address in enumerate(filter(None, os.environ.get(
+    'DB_REPLICAS', ''
+).split(','))):
+    replica = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if replica['ENGINE'].endswith('sqlite3'):
+        replica['NAME'] = os.path.join(BASE_DIR, address)
+    else:
+        host, _, port = address.partition(':')
+        replica.update(HOST=host, PORT=port or replica['PORT'])
+    DATABASES[f'replica_{index}'] = replica
+    DATABASE_REPLICAS.append(f'replica_{index}')
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает из основной базы.
+PRIMARY_STICKY_SECONDS = 5
+PRIMARY_STICKY_COOKIE = 'primary_until'
+# Наибольшее допустимое отставание реплик в секундах. Столько времени
+# после изменения области страницы с ней читаются из основной базы,
+# чтобы в кеш страниц и в ETag не попали данные отставшей реплики.
+REPLICA_MAX_LAG = PRIMARY_STICKY_SECONDS
 
 
 # Password validation
@@ -119,6 +164,15 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+# collectstatic собирает статику сюда, StaticFilesMiddleware отдаёт её
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# Кеширование статики без хеша в имени, в секундах
+STATIC_MAX_AGE = 60
+# Bootstrap, шрифты и иконки из static/vendor (manage.py fetch_assets)
+# вместо CDN
+LOCAL_VENDOR_ASSETS = False
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -128,9 +182,90 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
+MEDIA_MAX_AGE = 60 * 60 * 24
+# Префикс internal-location nginx: медиа отдаёт веб-сервер
+# по заголовку X-Accel-Redirect
+MEDIA_ACCEL_PREFIX = None
+
+# Общий для всех процессов кеш выбирается переменной CACHE_BACKEND:
+# locmem — свой в каждом процессе, file и db — общие на одной машине
+# (для db нужен manage.py createcachetable), memcached и redis —
+# внешние сервисы (нужны pylibmc или django-redis).
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'yatube'),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(BASE_DIR, 'cache'),
+    ),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'cache_table'),
+    'memcached': (
+        'django.core.cache.backends.memcached.PyLibMCCache',
+        '127.0.0.1:11211',
+    ),
+    'redis': ('django_redis.cache.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHE_OPTIONS = {
+    'locmem': {'MAX_ENTRIES': 10000},
+    'file': {'MAX_ENTRIES': 10000},
+    'db': {'MAX_ENTRIES': 10000},
+    'memcached': {'binary': True, 'behaviors': {'tcp_nodelay': True}},
+    'redis': {
+        'CONNECTION_POOL_KWARGS': {
+            'max_connections': int(os.environ.get('CACHE_POOL_SIZE', 50)),
+        },
+    },
+}[CACHE_BACKEND]
+# Слои кеша лежат в одном хранилище и различаются префиксом ключей,
+# поэтому clear() любого слоя очищает всё хранилище.
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    layer: {
+        'BACKEND': 'core.cache_backends.StatsCache',
+        'WRAPPED': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]
+        ),
+        'LAYER': layer,
+        'KEY_PREFIX': layer,
+        'OPTIONS': CACHE_OPTIONS,
     }
+    for layer in ('default', 'sessions', 'fragments')
+}
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Пагинация лент постов: 'page' - нумерованные страницы,
+# 'cursor' - keyset-пагинация по (pub_date, id) без COUNT и OFFSET.
+POSTS_PAGINATION = 'page'
+# Брать количество постов для нумерованных страниц из кеша.
+POSTS_APPROXIMATE_COUNT = False
+
+# Медленные запросы с полным SQL пишутся в лог core.timing
+SLOW_REQUEST_MS = 500
+# Доля запросов, для которых сохраняется SQL
+SLOW_REQUEST_SAMPLE_RATE = 0.1
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('TIMING_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
 }
+
+# Миниатюры создаются в фоне, до готовности отдаётся заглушка
+THUMBNAIL_BACKEND = 'core.thumbnails.PregeneratingThumbnailBackend'
+THUMBNAIL_PLACEHOLDER = 'img/placeholder.svg'
+
+# Потоки для фоновой обработки картинок
+BACKGROUND_WORKERS = 2
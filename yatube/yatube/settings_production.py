@@ -0,0 +1,68 @@
+"""Настройки для боевого запуска.
+
+DJANGO_SETTINGS_MODULE=yatube.settings_production; параметры базы
+задаются переменными DB_* (см. yatube/settings.py).
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('SECRET_KEY', SECRET_KEY)  # noqa: F405
+
+ALLOWED_HOSTS = os.environ.get(
+    'ALLOWED_HOSTS', ','.join(ALLOWED_HOSTS)  # noqa: F405
+).split(',')
+
+# Соединения живут между запросами: без этого каждый запрос тратит
+# время на подключение, а в PostgreSQL — ещё и на запуск backend-процесса.
+# Для пула на стороне сервера PostgreSQL ставится pgbouncer
+# в transaction-режиме, тогда DB_CONN_MAX_AGE можно поднимать.
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+    if database['ENGINE'].endswith('postgresql'):
+        database['OPTIONS'] = {
+            'connect_timeout': 5,
+            'keepalives': 1,
+            'keepalives_idle': 60,
+        }
+
+# WAL: читатели не ждут писателя; synchronous=NORMAL в режиме WAL
+# не теряет целостность, а fsync делается только на контрольных точках.
+# busy_timeout даёт писателям подождать блокировку, а не падать
+# с «database is locked»; он идёт первым, чтобы ждали и остальные PRAGMA.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -16000,
+    'temp_store': 'memory',
+}
+
+# Шаблоны читаются и разбираются один раз на процесс; после изменения
+# шаблонов процесс нужно перезапустить.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'debug': False,
+        'loaders': [(
+            'django.template.loaders.cached.Loader',
+            [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ],
+        )],
+    },
+}]
+
+# collectstatic: имена с хешем, минификация и заранее сжатые .gz/.br
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+# Локальные копии сторонних файлов не хранятся в репозитории:
+# включать, только если перед collectstatic запущен manage.py fetch_assets
+LOCAL_VENDOR_ASSETS = os.environ.get('LOCAL_VENDOR_ASSETS', '') == '1'
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX') or None